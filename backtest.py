@@ -0,0 +1,264 @@
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from options_base import LEG_CODES
+from black_scholes import leg_values
+
+class RollRule:
+    """
+    Rule to open a strategy on every roll date with strikes set relative to
+    the spot, e.g. RollRule(ShortIronCondor, (.91, .97, 1.03, 1.09), 30, 21,
+    side=-1) sells a 30-day iron condor every 21 rows of the price series.
+
+    moneyness can also be a function mapping the spot to the strikes. With a
+    strike_index the strikes are snapped to the closest listed ones.
+
+    The factory is built once, at a spot of 100 with the strikes rounded to
+    six decimals, to learn the leg types and quantities and which strike
+    feeds each leg. Rolls then only move the strikes, so the per-roll
+    validation of the strategy constructors (e.g. exact equidistance of
+    float strikes) cannot reject a roll. The factory can also be a list of
+    (quantity, 'Call' | 'Put' | 'Stock') legs, one per strike (stocks take
+    no strike and are bought at the spot).
+    """
+
+    def __init__(self, factory, moneyness, plazo, every, side=1, strike_step=None, strike_index=None):
+
+        self.factory = factory
+
+        self.moneyness = moneyness if callable(moneyness) else tuple(moneyness)
+
+        self.plazo = plazo
+
+        self.every = every
+
+        self.side = side
+
+        self.strike_step = strike_step
+
+        self.strike_index = strike_index
+
+        self.codes, self.quantities, self.strike_args = self._template()
+
+    def _template(self):
+        """
+        Leg codes, quantities and, per leg, the position of its strike among
+        the rule strikes (-1 for stock legs, struck at the spot).
+        """
+
+        reference = np.round(self._raw_strikes(100.), 6)
+
+        if not callable(self.factory):
+
+            legs = list(self.factory)
+
+            codes, args, k = [], [], 0
+
+            for quantity, option_type in legs:
+
+                codes.append(LEG_CODES[option_type])
+
+                args.append(-1 if option_type == 'Stock' else k)
+
+                k += option_type != 'Stock'
+
+            if k != len(reference):
+
+                raise ValueError(f'The rule gives {len(reference)} strikes for {k} option legs.')
+
+            return np.array(codes), np.array([q for q, _ in legs], dtype=float), np.array(args)
+
+        try:
+
+            codes, strikes, quantities = self.factory(100., *reference).leg_arrays()
+
+        except ValueError as error:
+
+            raise ValueError(f'The factory rejects the strikes {reference.tolist()} at a spot of 100 ({error}); '
+                             'pass the legs as a list of (quantity, option type) instead.') from error
+
+        args = np.array([-1 if code == LEG_CODES['Stock'] else int(np.argmin(np.abs(reference - strike)))
+                         for code, strike in zip(codes, strikes)])
+
+        return codes, quantities, args
+
+    def _raw_strikes(self, spot):
+        """
+        Strikes before rounding for a spot or an array of spots, with the
+        strikes along a new last axis.
+        """
+
+        spot = np.asarray(spot, dtype=float)
+
+        if callable(self.moneyness):
+
+            strikes = [np.atleast_1d(np.asarray(self.moneyness(s), dtype=float)) for s in spot.ravel()]
+
+            return np.reshape(strikes, spot.shape + (-1,))
+
+        return spot[..., None] * np.asarray(self.moneyness)
+
+    def strikes(self, spot):
+
+        strikes = self._raw_strikes(spot)
+
+        if self.strike_step:
+
+            strikes = np.round(strikes / self.strike_step) * self.strike_step
+
+        if self.strike_index is not None:
+
+            strikes = self.strike_index.nearest(strikes)
+
+        return strikes
+
+    def leg_strikes(self, spot):
+        """
+        Strike of every leg of the template when opening at spot (a scalar or
+        an array of spots, legs along a new last axis).
+        """
+
+        spot = np.asarray(spot, dtype=float)
+
+        strikes = self.strikes(spot)[..., np.maximum(self.strike_args, 0)]
+
+        return np.where(self.strike_args < 0, spot[..., None], strikes)
+
+class BacktestResult:
+
+    def __init__(self, tickers, roll_rows, roll_pnl, daily_pnl):
+
+        self.tickers = tickers
+
+        self.roll_rows = roll_rows
+
+        self.roll_pnl = roll_pnl
+
+        self.daily_pnl = daily_pnl
+
+    @property
+    def total_pnl(self):
+
+        return self.daily_pnl.sum(axis=0)
+
+    def __repr__(self):
+
+        return (f'Backtest: {len(self.tickers)} tickers, {len(self.roll_rows)} rolls, '
+                f'total P&L {self.total_pnl.sum():.2f}')
+
+def load_prices(path, delimiter=','):
+    """
+    Reads daily closes from a text file with a header row: the first column
+    holds the dates and every other column the closes of one ticker.
+
+    Retorno
+    -------
+    dates: np.ndarray
+    tickers: list
+    prices: np.ndarray
+        Array of shape (days, tickers).
+    """
+
+    with open(path) as f:
+
+        tickers = f.readline().strip().split(delimiter)[1:]
+
+    dates = np.loadtxt(path, delimiter=delimiter, skiprows=1, usecols=0, dtype=str)
+
+    prices = np.loadtxt(path, delimiter=delimiter, skiprows=1, usecols=range(1, len(tickers) + 1), ndmin=2)
+
+    return dates, tickers, prices
+
+def _backtest_block(prices, vols, rule, risk_free, days_per_row):
+    """
+    Marks every roll of every ticker in the block at once.
+
+    Retorno
+    -------
+    roll_pnl: np.ndarray
+        Shape (tickers, rolls).
+    daily_pnl: np.ndarray
+        Shape (days, tickers), P&L of all open strategies per row.
+    """
+
+    n_days, n_tickers = prices.shape
+
+    hold = int(round(rule.plazo / days_per_row))
+
+    roll_rows = np.arange(0, n_days - hold, rule.every)
+
+    if len(roll_rows) == 0:
+
+        raise ValueError(f'The price series has {n_days} rows; it must be longer than the {hold} rows of a holding.')
+
+    offsets = np.arange(hold + 1)
+
+    rows = roll_rows[:, None] + offsets[None, :]
+
+    strikes = rule.leg_strikes(prices[roll_rows].T)
+
+    codes = np.broadcast_to(rule.codes, strikes.shape)
+
+    quantities = rule.side * np.broadcast_to(rule.quantities, strikes.shape)
+
+    spots = prices[rows].transpose(2, 0, 1)
+
+    sigma = vols[rows].transpose(2, 0, 1)
+
+    tau = np.clip(rule.plazo - offsets * days_per_row, 0., None) / 365.
+
+    tau[-1] = 0.
+
+    leg_marks = leg_values(codes[:, :, None, :], strikes[:, :, None, :], spots[..., None], tau[None, None, :, None],
+                           risk_free, sigma[..., None], discount=True)
+
+    marks = np.sum(leg_marks * quantities[:, :, None, :], axis=-1)
+
+    daily = np.diff(marks, axis=-1)
+
+    daily_pnl = np.zeros((n_days, n_tickers))
+
+    np.add.at(daily_pnl, (rows[:, 1:], slice(None)), daily.transpose(1, 2, 0))
+
+    return roll_rows, marks[..., -1] - marks[..., 0], daily_pnl
+
+def backtest(prices, rule, vols, risk_free, tickers=None, days_per_row=365. / 252., n_workers=1, tickers_per_task=50):
+    """
+    Rolls a strategy over daily price series and marks it every row with
+    discounted Black-Scholes values, vectorized over roll dates and tickers.
+    Blocks of tickers are sent to a process pool when n_workers > 1.
+
+    Argumentos
+    ----------
+    prices: np.ndarray
+        Closes of shape (days, tickers).
+    rule: RollRule
+    vols: float or np.ndarray
+        Volatility used for marking, scalar or of the same shape as prices.
+    days_per_row: float
+        Calendar days between consecutive rows.
+    """
+
+    prices = np.asarray(prices, dtype=float).reshape(len(prices), -1)
+
+    vols = np.broadcast_to(np.asarray(vols, dtype=float), prices.shape)
+
+    tickers = list(range(prices.shape[1])) if tickers is None else list(tickers)
+
+    blocks = [slice(start, start + tickers_per_task) for start in range(0, prices.shape[1], tickers_per_task)]
+
+    args = [(prices[:, block], vols[:, block], rule, risk_free, days_per_row) for block in blocks]
+
+    if n_workers > 1:
+
+        with ProcessPoolExecutor(n_workers) as pool:
+
+            results = list(pool.map(_backtest_block, *zip(*args)))
+
+    else:
+
+        results = [_backtest_block(*arg) for arg in args]
+
+    roll_rows = results[0][0]
+
+    return BacktestResult(tickers, roll_rows, np.concatenate([r[1] for r in results]),
+                          np.concatenate([r[2] for r in results], axis=1))
@@ -0,0 +1,231 @@
+import numpy as np
+from math import erf
+from statistics import NormalDist
+import matplotlib.pyplot as plt
+from options_base import LEG_CODES
+
+try:
+    from scipy.special import ndtr, ndtri
+except ImportError:
+    ndtr = ndtri = None
+
+_erf = np.frompyfunc(erf, 1, 1)
+
+_inv_cdf = np.frompyfunc(NormalDist().inv_cdf, 1, 1)
+
+def norm_cdf(x):
+
+    x = np.asarray(x, dtype=float)
+
+    if ndtr is not None:
+
+        return ndtr(x)
+
+    return .5 * (1. + _erf(x / np.sqrt(2.)).astype(float))
+
+def norm_ppf(p):
+
+    p = np.asarray(p, dtype=float)
+
+    if ndtri is not None:
+
+        return ndtri(p)
+
+    return _inv_cdf(p).astype(float)
+
+def norm_pdf(x):
+
+    return np.exp(-.5 * np.asarray(x, dtype=float)**2) / np.sqrt(2. * np.pi)
+
+def leg_values(codes, strikes, spots, tau, risk_free, sigma, discount=False):
+    """
+    Black-Scholes value of forward (stock), call and put legs, broadcast over
+    all arguments. tau is the time to expiry in years; expired legs are worth
+    their payoff at the given spot.
+
+    Like EuroDerivative.get_price, values are not discounted unless
+    discount=True.
+    """
+
+    codes, strikes, spots, tau = np.broadcast_arrays(codes, np.asarray(strikes, dtype=float),
+                                                     np.asarray(spots, dtype=float), np.asarray(tau, dtype=float))
+
+    sigma = np.asarray(sigma, dtype=float)
+
+    live = tau > 0.
+
+    safe_tau = np.where(live, tau, 1.)
+
+    forward = spots * np.exp(risk_free * safe_tau)
+
+    vol = sigma * np.sqrt(safe_tau)
+
+    d1 = (np.log(forward / strikes) + .5 * vol**2) / vol
+
+    d2 = d1 - vol
+
+    call = forward * norm_cdf(d1) - strikes * norm_cdf(d2)
+
+    values = np.where(codes == LEG_CODES['Call'], call, forward - strikes)
+
+    values = np.where(codes == LEG_CODES['Put'], call - forward + strikes, values)
+
+    if discount:
+
+        values = values * np.exp(-risk_free * safe_tau)
+
+    intrinsic = np.where(codes == LEG_CODES['Call'], np.maximum(spots - strikes, 0.), spots - strikes)
+
+    intrinsic = np.where(codes == LEG_CODES['Put'], np.maximum(strikes - spots, 0.), intrinsic)
+
+    return np.where(live, values, intrinsic)
+
+def leg_greeks(codes, strikes, spots, tau, risk_free, sigma, discount=False):
+    """
+    Delta, gamma and theta (per year) of forward, call and put legs, with the
+    same conventions as leg_values. Theta follows from the pricing PDE.
+    """
+
+    codes, strikes, spots, tau = np.broadcast_arrays(codes, np.asarray(strikes, dtype=float),
+                                                     np.asarray(spots, dtype=float), np.asarray(tau, dtype=float))
+
+    sigma = np.asarray(sigma, dtype=float)
+
+    live = tau > 0.
+
+    safe_tau = np.where(live, tau, 1.)
+
+    growth = 1. if discount else np.exp(risk_free * safe_tau)
+
+    vol = sigma * np.sqrt(safe_tau)
+
+    d1 = (np.log(spots / strikes) + (risk_free + .5 * sigma**2) * safe_tau) / vol
+
+    delta = np.where(codes == LEG_CODES['Call'], norm_cdf(d1), 1.)
+
+    delta = growth * np.where(codes == LEG_CODES['Put'], norm_cdf(d1) - 1., delta)
+
+    gamma = np.where(codes == LEG_CODES['Stock'], 0., growth * norm_pdf(d1) / (spots * vol))
+
+    values = leg_values(codes, strikes, spots, tau, risk_free, sigma, discount)
+
+    theta = -(risk_free * spots * delta + .5 * sigma**2 * spots**2 * gamma - (risk_free * values if discount else 0.))
+
+    intrinsic_delta = np.where(codes == LEG_CODES['Call'], 1. * (spots > strikes), 1.)
+
+    intrinsic_delta = np.where(codes == LEG_CODES['Put'], -1. * (spots < strikes), intrinsic_delta)
+
+    return np.where(live, delta, intrinsic_delta), np.where(live, gamma, 0.), np.where(live, theta, 0.)
+
+def analytic_price(derivative, risk_free, sigma, plazo, initial_stock_price=None, discount=False):
+    """
+    Closed-form expected payoff of a vanilla option or strategy under GBM.
+    Legs with their own expiry are valued to that expiry.
+    """
+
+    s0 = derivative.initial_stock_price if initial_stock_price is None else initial_stock_price
+
+    codes, strikes, quantities = derivative.leg_arrays()
+
+    return quantities @ leg_values(codes, strikes, s0, leg_expiries(derivative, plazo) / 365., risk_free, sigma, discount)
+
+def leg_expiries(derivative, plazo):
+    """
+    Days to expiry of each leg, defaulting to plazo.
+    """
+
+    if hasattr(derivative, 'positions'):
+
+        return np.array([plazo if pos.plazo is None else pos.plazo for pos in derivative.positions], dtype=float)
+
+    return np.array([plazo], dtype=float)
+
+def value_surface(derivative, spots, days, risk_free, sigma, plazo, discount=False):
+    """
+    Values the derivative at every (date, spot) pair in one vectorized pass.
+
+    Argumentos
+    ----------
+    spots: array_like
+        Spot prices.
+    days: array_like
+        Days elapsed from today at which to value the derivative.
+    plazo: float
+        Days to expiry of the legs without their own expiry.
+
+    Retorno
+    -------
+    values, theta: np.ndarray
+        Arrays of shape (len(days), len(spots)); theta is per calendar day.
+    """
+
+    codes, strikes, quantities = derivative.leg_arrays()
+
+    spots = np.asarray(spots, dtype=float)[None, :, None]
+
+    tau = np.clip(leg_expiries(derivative, plazo)[None, :] - np.asarray(days, dtype=float)[:, None], 0., None) / 365.
+
+    tau = tau[:, None, :]
+
+    values = leg_values(codes, strikes, spots, tau, risk_free, sigma, discount) @ quantities
+
+    _, _, theta = leg_greeks(codes, strikes, spots, tau, risk_free, sigma, discount)
+
+    return values, theta @ quantities / 365.
+
+def plot_value_surface(derivative, min_val, max_val, days, risk_free, sigma, plazo, discount=False):
+
+    price_range = np.arange(min_val, max_val, 0.01)
+
+    values, _ = value_surface(derivative, price_range, days, risk_free, sigma, plazo, discount)
+
+    fig, ax = plt.subplots(figsize=(12,8))
+
+    for day, curve in zip(days, values):
+
+        ax.plot(price_range, curve, label=f'Day {day}')
+
+    ax.plot(price_range, derivative.payoff(price_range), color='black', linestyle='--', label='Expiry')
+
+    ax.set_xlabel('$S_{t}$', fontsize=14)
+
+    ax.set_ylabel('Value', fontsize=14)
+
+    ax.legend()
+
+    return fig, ax
+
+def implied_vol(prices, codes, strikes, spots, tau, risk_free, low=1e-4, high=5., tol=1e-8, max_iter=100):
+    """
+    Implied volatilities of many quotes at once by vectorized bisection on
+    discounted Black-Scholes values. Quotes outside the no-arbitrage bounds
+    get NaN.
+    """
+
+    prices, codes, strikes, spots, tau = np.broadcast_arrays(np.asarray(prices, dtype=float), codes,
+                                                             np.asarray(strikes, dtype=float),
+                                                             np.asarray(spots, dtype=float),
+                                                             np.asarray(tau, dtype=float))
+
+    low = np.full(prices.shape, low)
+
+    high = np.full(prices.shape, high)
+
+    valid = ((leg_values(codes, strikes, spots, tau, risk_free, low, discount=True) <= prices) &
+             (prices <= leg_values(codes, strikes, spots, tau, risk_free, high, discount=True)))
+
+    for _ in range(max_iter):
+
+        mid = .5 * (low + high)
+
+        too_low = leg_values(codes, strikes, spots, tau, risk_free, mid, discount=True) < prices
+
+        low = np.where(too_low, mid, low)
+
+        high = np.where(too_low, high, mid)
+
+        if np.max(high - low, initial=0.) < tol:
+
+            break
+
+    return np.where(valid, .5 * (low + high), np.nan)
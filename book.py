@@ -0,0 +1,311 @@
+import numpy as np
+from options_base import LEG_CODES
+from stocks_base import Stock
+from black_scholes import leg_values, leg_greeks, leg_expiries
+
+try:
+    from scipy import sparse
+except ImportError:
+    sparse = None
+
+def instrument_payoffs(codes, strikes, st):
+    """
+    Payoffs of forward, call and put instruments, shape (len(st), n_instruments).
+    """
+
+    diff = np.asarray(st)[:, None] - strikes[None, :]
+
+    payoffs = np.where(codes == LEG_CODES['Call'], np.maximum(diff, 0.), diff)
+
+    return np.where(codes == LEG_CODES['Put'], np.maximum(-diff, 0.), payoffs)
+
+class Book:
+    """
+    Collection of strategies whose legs are netted into a unique inventory
+    of (underlying, type, strike, expiry) instruments. Instruments are priced
+    and risked once and mapped back to the strategies through a (sparse)
+    exposure matrix of shape (strategies, instruments).
+    """
+
+    def __init__(self, strategies=None, plazo=None):
+
+        self._strategies = list(strategies) if strategies is not None else []
+
+        self._plazo = plazo
+
+        self._inventory = None
+
+    @property
+    def strategies(self):
+
+        return self._strategies
+
+    @property
+    def plazo(self):
+
+        return self._plazo
+
+    def __len__(self):
+
+        return len(self._strategies)
+
+    def __repr__(self):
+
+        return f'Book: {len(self)} strategies, {self.n_legs} legs, {len(self.instruments)} instruments'
+
+    def add_strategy(self, strategies):
+
+        if isinstance(strategies, list):
+
+            self._strategies.extend(strategies)
+
+        else:
+
+            self._strategies.append(strategies)
+
+        self._inventory = None
+
+    def _net(self):
+
+        names = [pos.underlying for s in self._strategies for pos in s.positions]
+
+        named = [name for name in dict.fromkeys(names) if name is not None]
+
+        if len(named) == 1:
+
+            # Legs without an underlying refer to the only one named, as in Strategy.get_price
+            names = [named[0]] * len(names)
+
+        underlyings = list(dict.fromkeys(names))
+
+        underlying_id = {name: j for j, name in enumerate(underlyings)}
+
+        legs = [strategy.leg_arrays() for strategy in self._strategies]
+
+        rows = np.column_stack([
+            [underlying_id[name] for name in names],
+            np.concatenate([leg[0] for leg in legs]),
+            np.concatenate([leg[1] for leg in legs]),
+            np.concatenate([leg_expiries(s, self._plazo) for s in self._strategies])])
+
+        if np.isnan(rows[:, 3]).any():
+
+            raise ValueError('Legs without their own expiry need the book plazo to be set.')
+
+        instruments, inverse = np.unique(rows, axis=0, return_inverse=True)
+
+        owner = np.repeat(np.arange(len(self._strategies)), [len(leg[0]) for leg in legs])
+
+        quantities = np.concatenate([leg[2] for leg in legs])
+
+        shape = (len(self._strategies), len(instruments))
+
+        if sparse is not None:
+
+            exposure = sparse.csr_matrix((quantities, (owner, inverse.ravel())), shape=shape)
+
+        else:
+
+            exposure = np.zeros(shape)
+
+            np.add.at(exposure, (owner, inverse.ravel()), quantities)
+
+        self._inventory = underlyings, instruments, exposure, len(quantities)
+
+    @property
+    def underlyings(self):
+
+        if self._inventory is None:
+            self._net()
+
+        return self._inventory[0]
+
+    @property
+    def instruments(self):
+        """
+        Array of shape (n_instruments, 4): underlying index, leg code, strike
+        and expiry in days.
+        """
+
+        if self._inventory is None:
+            self._net()
+
+        return self._inventory[1]
+
+    @property
+    def exposure(self):
+
+        if self._inventory is None:
+            self._net()
+
+        return self._inventory[2]
+
+    @property
+    def n_legs(self):
+
+        if self._inventory is None:
+            self._net()
+
+        return self._inventory[3]
+
+    @property
+    def net_quantities(self):
+        """
+        Total quantity of each instrument across the book.
+        """
+
+        return np.asarray(self.exposure.sum(axis=0)).ravel()
+
+    @property
+    def codes(self):
+
+        return self.instruments[:, 1].astype(int)
+
+    @property
+    def strikes(self):
+
+        return self.instruments[:, 2]
+
+    @property
+    def expiries(self):
+
+        return self.instruments[:, 3]
+
+    def _single_underlying(self):
+
+        if len(self.underlyings) > 1:
+
+            raise ValueError('Only books on a single underlying can be priced with one spot.')
+
+    def to_strategies(self, values):
+        """
+        Maps per-instrument values (instruments along the first axis) to
+        per-strategy values.
+        """
+
+        values = np.asarray(values)
+
+        return np.asarray(self.exposure @ values.reshape(len(values), -1)).reshape((len(self),) + values.shape[1:])
+
+    def values(self, spots, sigmas, risk_free, days=0., discount=False):
+        """
+        Analytic values of each instrument on a (spots x sigmas) grid, shape
+        (n_instruments, len(spots), len(sigmas)).
+        """
+
+        self._single_underlying()
+
+        tau = np.clip(self.expiries - days, 0., None)[:, None, None] / 365.
+
+        return leg_values(self.codes[:, None, None], self.strikes[:, None, None],
+                          np.asarray(spots, dtype=float)[None, :, None], tau, risk_free,
+                          np.asarray(sigmas, dtype=float)[None, None, :], discount)
+
+    def values_along(self, spots, sigmas, risk_free, days=0., discount=False):
+        """
+        Analytic values of each instrument under paired (spot, sigma)
+        scenarios, shape (n_instruments, len(spots)).
+        """
+
+        self._single_underlying()
+
+        tau = np.clip(self.expiries - days, 0., None)[:, None] / 365.
+
+        return leg_values(self.codes[:, None], self.strikes[:, None], np.asarray(spots, dtype=float)[None, :],
+                          tau, risk_free, np.asarray(sigmas, dtype=float)[None, :], discount)
+
+    def payoffs(self, st):
+        """
+        Payoff of each strategy at the expiry of each leg, shape (n, len(book)).
+
+        st holds the prices at the distinct expiries of the book, in increasing
+        order, with shape (n_expiries, n) as returned by Stock.sim_gbm_path.
+        Terminal prices of shape (n,) are accepted when all the legs expire
+        together.
+        """
+
+        self._single_underlying()
+
+        expiries, row = np.unique(self.expiries, return_inverse=True)
+
+        st = np.asarray(st)
+
+        if st.ndim == 1:
+
+            if len(expiries) > 1:
+
+                raise ValueError('Legs expire on different dates: pass prices of shape (n_expiries, n) '
+                                 'simulated along the book expiries.')
+
+            st = st[None, :]
+
+        if len(st) != len(expiries):
+
+            raise ValueError(f'Expected prices at {len(expiries)} expiries, got {len(st)}.')
+
+        row = row.ravel()
+
+        payoffs = np.empty((st.shape[1], len(self.instruments)))
+
+        for j in range(len(expiries)):
+
+            legs = np.flatnonzero(row == j)
+
+            payoffs[:, legs] = instrument_payoffs(self.codes[legs], self.strikes[legs], st[j])
+
+        return self.to_strategies(payoffs.T).T
+
+    def get_price(self, risk_free, sigma, initial_stock_price, n=None, seed=None, engine='analytic', draws=None):
+        """
+        Prices every distinct instrument once and returns the expected payoff
+        of each strategy. With engine='mc' all expiries share one set of paths,
+        drawn from draws of shape (n_expiries, n) when given.
+        """
+
+        self._single_underlying()
+
+        if draws is not None and engine != 'mc':
+
+            raise ValueError(f'Precomputed draws cannot be used with engine "{engine}".')
+
+        if engine == 'analytic':
+
+            instrument_prices = self.values([initial_stock_price], [sigma], risk_free)[:, 0, 0]
+
+        elif engine == 'mc':
+
+            if seed and draws is None:
+                np.random.seed(seed)
+
+            expiries, row = np.unique(self.expiries, return_inverse=True)
+
+            st = Stock.sim_gbm_path(initial_stock_price, risk_free, sigma, expiries, n, draws)
+
+            instrument_prices = np.array([np.mean(instrument_payoffs(self.codes[[j]], self.strikes[[j]], st[row[j]]))
+                                          for j in range(len(self.instruments))])
+
+        else:
+
+            raise ValueError(f'Pricing engine "{engine}" not recognized.')
+
+        return self.to_strategies(instrument_prices)
+
+    def greeks(self, risk_free, sigma, initial_stock_price, days=0.):
+        """
+        Delta, gamma and theta (per year) of each strategy.
+        """
+
+        self._single_underlying()
+
+        tau = np.clip(self.expiries - days, 0., None) / 365.
+
+        return tuple(self.to_strategies(greek) for greek in
+                     leg_greeks(self.codes, self.strikes, initial_stock_price, tau, risk_free, sigma))
+
+def as_book(strategies, plazo):
+
+    if isinstance(strategies, Book):
+
+        return strategies
+
+    return Book(strategies, plazo)
@@ -0,0 +1,284 @@
+import os
+import numpy as np
+from itertools import islice
+from options_base import LEG_CODES, Strategy, Call, Put
+from black_scholes import implied_vol
+from strike_index import StrikeIndex
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+COLUMNS = ('strike', 'expiry', 'type', 'bid', 'ask', 'iv')
+
+_TYPE_CODES = {'c': LEG_CODES['Call'], 'call': LEG_CODES['Call'], 'p': LEG_CODES['Put'], 'put': LEG_CODES['Put']}
+
+def type_codes(types):
+    """
+    Maps 'C'/'Call'/'P'/'Put' labels (any case) to leg codes.
+    """
+
+    labels, inverse = np.unique(np.char.lower(np.char.strip(np.asarray(types, dtype=str))), return_inverse=True)
+
+    unknown = [label for label in labels if label not in _TYPE_CODES]
+
+    if unknown:
+
+        raise ValueError(f'Option types {unknown} not recognized.')
+
+    return np.array([_TYPE_CODES[label] for label in labels], dtype=np.int8)[inverse.ravel()]
+
+class OptionChain:
+    """
+    Columnar option chain (strike, expiry in days, type code, bid, ask, iv)
+    sorted by expiry, type and strike, so every expiry and type is a
+    contiguous block that can be searched with np.searchsorted.
+    """
+
+    def __init__(self, strike, expiry, type, bid, ask, iv=None, underlying=None, is_sorted=False):
+
+        columns = {'strike': np.asarray(strike, dtype=float), 'expiry': np.asarray(expiry, dtype=float),
+                   'type': np.asarray(type, dtype=np.int8), 'bid': np.asarray(bid, dtype=float),
+                   'ask': np.asarray(ask, dtype=float)}
+
+        columns['iv'] = np.full(len(columns['strike']), np.nan) if iv is None else np.asarray(iv, dtype=float)
+
+        if not is_sorted:
+
+            order = np.lexsort((columns['strike'], columns['type'], columns['expiry']))
+
+            columns = {name: column[order] for name, column in columns.items()}
+
+        self._columns = columns
+
+        self.underlying = underlying
+
+        self._expiries, self._expiry_start = np.unique(columns['expiry'], return_index=True)
+
+    def __len__(self):
+
+        return len(self._columns['strike'])
+
+    def __repr__(self):
+
+        return f'OptionChain: {self.underlying or ""} {len(self)} quotes, {len(self._expiries)} expiries'
+
+    def __getattr__(self, name):
+
+        if name in COLUMNS:
+
+            return self._columns[name]
+
+        raise AttributeError(name)
+
+    @property
+    def expiries(self):
+
+        return self._expiries
+
+    @property
+    def mid(self):
+
+        return .5 * (self.bid + self.ask)
+
+    def block(self, expiry, option_type):
+        """
+        Row slice holding the quotes of one expiry and option type.
+        """
+
+        j = np.searchsorted(self._expiries, expiry)
+
+        if j == len(self._expiries) or self._expiries[j] != expiry:
+
+            raise KeyError(f'Expiry {expiry} not in the chain.')
+
+        start = self._expiry_start[j]
+
+        end = self._expiry_start[j + 1] if j + 1 < len(self._expiries) else len(self)
+
+        types = self.type[start:end]
+
+        code = LEG_CODES[option_type]
+
+        return slice(start + np.searchsorted(types, code), start + np.searchsorted(types, code, side='right'))
+
+    def strikes(self, expiry, option_type):
+
+        return self.strike[self.block(expiry, option_type)]
+
+    def strike_index(self, expiry, option_type):
+        """
+        StrikeIndex over the quotes of one expiry and option type.
+        """
+
+        rows = self.block(expiry, option_type)
+
+        return StrikeIndex(self.strike[rows], option_type, expiry, self.iv[rows], np.arange(rows.start, rows.stop))
+
+    def find(self, expiry, option_type, strikes):
+        """
+        Row indices of the quotes with exactly the given strikes.
+        """
+
+        rows = self.block(expiry, option_type)
+
+        block_strikes = self.strike[rows]
+
+        strikes = np.asarray(strikes, dtype=float)
+
+        j = np.searchsorted(block_strikes, strikes)
+
+        if np.any(j == len(block_strikes)) or np.any(block_strikes[np.minimum(j, len(block_strikes) - 1)] != strikes):
+
+            raise KeyError(f'Strikes {strikes} not all listed for expiry {expiry}.')
+
+        return rows.start + j
+
+    def select(self, expiry=None, option_type=None, min_strike=-np.inf, max_strike=np.inf):
+        """
+        Boolean mask of the quotes matching the filters, for scanning.
+        """
+
+        mask = (self.strike >= min_strike) & (self.strike <= max_strike)
+
+        if expiry is not None:
+
+            mask &= self.expiry == expiry
+
+        if option_type is not None:
+
+            mask &= self.type == LEG_CODES[option_type]
+
+        return mask
+
+    def implied_vols(self, spot, risk_free, prices=None):
+        """
+        Implied volatilities of all quotes from their mids (or given prices),
+        computed in one vectorized pass and stored in the iv column.
+        """
+
+        prices = self.mid if prices is None else prices
+
+        self._columns['iv'] = implied_vol(prices, self.type, self.strike, spot, self.expiry / 365., risk_free)
+
+        return self.iv
+
+    def strategy(self, name, legs, expiry, initial_stock_price=None):
+        """
+        Builds a Strategy from (quantity, option_type, strike) legs listed at
+        one expiry. Each position carries the expiry of its quote.
+
+        Retorno
+        -------
+        strategy: Strategy
+        premium: float
+            Cost of the legs at mid prices.
+        """
+
+        strategy = Strategy(name)
+
+        if initial_stock_price is not None:
+
+            strategy.initial_stock_price = initial_stock_price
+
+        premium = 0.
+
+        for quantity, option_type, strike in legs:
+
+            row = self.find(expiry, option_type, [strike])[0]
+
+            instrument = Call(self.strike[row]) if option_type == 'Call' else Put(self.strike[row])
+
+            strategy.add_position([(quantity, instrument, self.underlying, self.expiry[row])])
+
+            premium += quantity * .5 * (self.bid[row] + self.ask[row])
+
+        return strategy, premium
+
+    def save(self, directory):
+        """
+        Writes every column to its own .npy file so that the chain can be
+        memory-mapped by OptionChain.load.
+        """
+
+        os.makedirs(directory, exist_ok=True)
+
+        for name, column in self._columns.items():
+
+            np.save(os.path.join(directory, f'{name}.npy'), column)
+
+    @classmethod
+    def load(cls, directory, underlying=None, mmap_mode='r'):
+
+        columns = {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mmap_mode) for name in COLUMNS}
+
+        return cls(underlying=underlying, is_sorted=True, **columns)
+
+def read_csv(path, underlying=None, delimiter=',', chunk_size=500_000):
+    """
+    Streams a chain from a text file with a header naming at least strike,
+    expiry (days), type, bid and ask, and optionally iv. Rows are parsed in
+    chunks straight into columns.
+    """
+
+    with open(path) as f:
+
+        header = [name.strip().lower() for name in f.readline().split(delimiter)]
+
+        missing = [name for name in COLUMNS[:-1] if name not in header]
+
+        if missing:
+
+            raise ValueError(f'Columns {missing} missing from {path}.')
+
+        names = [name for name in COLUMNS if name in header]
+
+        chunks = {name: [] for name in names}
+
+        while True:
+
+            lines = list(islice(f, chunk_size))
+
+            if not lines:
+
+                break
+
+            numeric = [name for name in names if name != 'type']
+
+            values = np.loadtxt(lines, delimiter=delimiter, usecols=[header.index(name) for name in numeric], ndmin=2)
+
+            for j, name in enumerate(numeric):
+
+                chunks[name].append(values[:, j])
+
+            types = np.loadtxt(lines, delimiter=delimiter, usecols=header.index('type'), dtype=str, ndmin=1)
+
+            chunks['type'].append(type_codes(types))
+
+    return OptionChain(underlying=underlying, **{name: np.concatenate(chunks[name]) for name in names})
+
+def read_parquet(path, underlying=None, batch_size=500_000):
+    """
+    Streams a chain from a Parquet file in record batches (requires pyarrow).
+    """
+
+    if pq is None:
+
+        raise ImportError('Reading Parquet chains requires pyarrow.')
+
+    parquet = pq.ParquetFile(path)
+
+    names = [name for name in COLUMNS if name in parquet.schema_arrow.names]
+
+    chunks = {name: [] for name in names}
+
+    for batch in parquet.iter_batches(batch_size=batch_size, columns=names):
+
+        for name in names:
+
+            column = batch.column(name).to_numpy(zero_copy_only=False)
+
+            chunks[name].append(type_codes(column) if name == 'type' else column)
+
+    return OptionChain(underlying=underlying, **{name: np.concatenate(chunks[name]) for name in names})
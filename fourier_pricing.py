@@ -0,0 +1,246 @@
+import numpy as np
+from options_base import LEG_CODES
+
+class GBMModel:
+
+    def __init__(self, risk_free, sigma):
+
+        self.risk_free = risk_free
+
+        self.sigma = sigma
+
+    def char_func(self, u, plazo):
+        """
+        Characteristic function of log(S_T / S_0).
+        """
+
+        t = plazo / 365.
+
+        return np.exp(1j * u * (self.risk_free - .5 * self.sigma**2) * t - .5 * self.sigma**2 * u**2 * t)
+
+    def cumulants(self, plazo):
+
+        t = plazo / 365.
+
+        return (self.risk_free - .5 * self.sigma**2) * t, self.sigma**2 * t, 0.
+
+class HestonModel:
+
+    def __init__(self, risk_free, v0, kappa, theta, vol_of_vol, rho):
+
+        self.risk_free = risk_free
+
+        self.v0 = v0
+
+        self.kappa = kappa
+
+        self.theta = theta
+
+        self.vol_of_vol = vol_of_vol
+
+        self.rho = rho
+
+    def char_func(self, u, plazo):
+        """
+        Characteristic function of log(S_T / S_0), in the "little trap"
+        formulation of Albrecher et al. to avoid branch cuts.
+        """
+
+        t = plazo / 365.
+
+        kappa, theta, xi, rho = self.kappa, self.theta, self.vol_of_vol, self.rho
+
+        beta = kappa - rho * xi * 1j * u
+
+        d = np.sqrt(beta**2 + xi**2 * (1j * u + u**2))
+
+        g = (beta - d) / (beta + d)
+
+        exp_dt = np.exp(-d * t)
+
+        c = (1j * u * self.risk_free * t + kappa * theta / xi**2 *
+             ((beta - d) * t - 2. * np.log((1. - g * exp_dt) / (1. - g))))
+
+        D = (beta - d) / xi**2 * (1. - exp_dt) / (1. - g * exp_dt)
+
+        return np.exp(c + D * self.v0)
+
+    def cumulants(self, plazo):
+        """
+        First two cumulants from Fang & Oosterlee (2008).
+        """
+
+        t = plazo / 365.
+
+        kappa, theta, xi, rho, v0 = self.kappa, self.theta, self.vol_of_vol, self.rho, self.v0
+
+        e = np.exp(-kappa * t)
+
+        c1 = self.risk_free * t + (1. - e) * (theta - v0) / (2. * kappa) - .5 * theta * t
+
+        c2 = (xi * t * kappa * e * (v0 - theta) * (8. * kappa * rho - 4. * xi) +
+              kappa * rho * xi * (1. - e) * (16. * theta - 8. * v0) +
+              2. * theta * kappa * t * (-4. * kappa * rho * xi + xi**2 + 4. * kappa**2) +
+              xi**2 * ((theta - 2. * v0) * e**2 + theta * (6. * e - 7.) + 2. * v0) +
+              8. * kappa**2 * (v0 - theta) * (1. - e)) / (8. * kappa**3)
+
+        return c1, abs(c2), 0.
+
+class MertonJumpModel:
+
+    def __init__(self, risk_free, sigma, intensity, jump_mean, jump_std):
+
+        self.risk_free = risk_free
+
+        self.sigma = sigma
+
+        self.intensity = intensity
+
+        self.jump_mean = jump_mean
+
+        self.jump_std = jump_std
+
+    def _compensator(self):
+
+        return self.intensity * (np.exp(self.jump_mean + .5 * self.jump_std**2) - 1.)
+
+    def char_func(self, u, plazo):
+        """
+        Characteristic function of log(S_T / S_0) with lognormal jumps.
+        """
+
+        t = plazo / 365.
+
+        drift = self.risk_free - .5 * self.sigma**2 - self._compensator()
+
+        jumps = self.intensity * (np.exp(1j * u * self.jump_mean - .5 * self.jump_std**2 * u**2) - 1.)
+
+        return np.exp(t * (1j * u * drift - .5 * self.sigma**2 * u**2 + jumps))
+
+    def cumulants(self, plazo):
+
+        t = plazo / 365.
+
+        mu, delta, lam = self.jump_mean, self.jump_std, self.intensity
+
+        c1 = (self.risk_free - .5 * self.sigma**2 - self._compensator() + lam * mu) * t
+
+        c2 = (self.sigma**2 + lam * (mu**2 + delta**2)) * t
+
+        c4 = lam * (mu**4 + 6. * delta**2 * mu**2 + 3. * delta**4) * t
+
+        return c1, c2, c4
+
+def _cos_grid(model, plazo, n_terms, truncation):
+
+    c1, c2, c4 = model.cumulants(plazo)
+
+    width = truncation * np.sqrt(c2 + np.sqrt(c4))
+
+    a, b = c1 - width, c1 + width
+
+    u = np.arange(n_terms) * np.pi / (b - a)
+
+    weights = np.real(model.char_func(u, plazo) * np.exp(-1j * u * a))
+
+    weights[0] *= .5
+
+    return a, b, u, weights
+
+def _chi(u, a, c, d):
+    """
+    Integral of exp(x) * cos(u (x - a)) over [c, d], broadcast over legs and terms.
+    """
+
+    ud, uc = u * (d - a), u * (c - a)
+
+    return (np.cos(ud) * np.exp(d) - np.cos(uc) * np.exp(c) +
+            u * (np.sin(ud) * np.exp(d) - np.sin(uc) * np.exp(c))) / (1. + u**2)
+
+def _psi(u, a, c, d):
+    """
+    Integral of cos(u (x - a)) over [c, d], broadcast over legs and terms.
+    """
+
+    safe_u = np.where(u == 0., 1., u)
+
+    return np.where(u == 0., d - c, (np.sin(u * (d - a)) - np.sin(u * (c - a))) / safe_u)
+
+def cos_coefficients(codes, strikes, s0, a, b, u):
+    """
+    Analytic cosine coefficients of each leg's payoff in x = log(S_T / S_0).
+
+    Retorno
+    -------
+    coefficients: np.ndarray
+        Array of shape (legs, n_terms).
+    """
+
+    codes = np.asarray(codes)[:, None]
+
+    log_k = np.log(np.asarray(strikes, dtype=float) / s0)[:, None]
+
+    k = np.asarray(strikes, dtype=float)[:, None]
+
+    is_call = codes == LEG_CODES['Call']
+
+    is_put = codes == LEG_CODES['Put']
+
+    c = np.where(is_call, np.clip(log_k, a, b), a)
+
+    d = np.where(is_put, np.clip(log_k, a, b), b)
+
+    sign = np.where(is_put, -1., 1.)
+
+    return 2. / (b - a) * sign * (s0 * _chi(u, a, c, d) - k * _psi(u, a, c, d))
+
+def cos_price(derivative, model, plazo, initial_stock_price=None, n_terms=256, truncation=10.):
+    """
+    Expected payoff of a vanilla option or a whole strategy in one expansion.
+
+    Like EuroDerivative.get_price, the result is not discounted.
+    """
+
+    s0 = derivative.initial_stock_price if initial_stock_price is None else initial_stock_price
+
+    codes, strikes, quantities = derivative.leg_arrays()
+
+    a, b, u, weights = _cos_grid(model, plazo, n_terms, truncation)
+
+    return quantities @ cos_coefficients(codes, strikes, s0, a, b, u) @ weights
+
+def cos_price_strikes(option_type, strikes, model, plazo, initial_stock_price, n_terms=256, truncation=10.):
+    """
+    Expected payoffs of a batch of calls or puts sharing one characteristic
+    function evaluation.
+    """
+
+    strikes = np.asarray(strikes, dtype=float)
+
+    codes = np.full(strikes.shape, LEG_CODES[option_type])
+
+    a, b, u, weights = _cos_grid(model, plazo, n_terms, truncation)
+
+    return cos_coefficients(codes, strikes, initial_stock_price, a, b, u) @ weights
+
+def cos_price_strategies(strategies, model, plazo, initial_stock_price, n_terms=256, truncation=10.):
+    """
+    Expected payoffs of many strategies on the same underlying, built from a
+    single coefficient matrix over all of their legs.
+    """
+
+    legs = [strategy.leg_arrays() for strategy in strategies]
+
+    codes = np.concatenate([leg[0] for leg in legs])
+
+    strikes = np.concatenate([leg[1] for leg in legs])
+
+    quantities = np.concatenate([leg[2] for leg in legs])
+
+    owner = np.repeat(np.arange(len(strategies)), [len(leg[0]) for leg in legs])
+
+    a, b, u, weights = _cos_grid(model, plazo, n_terms, truncation)
+
+    leg_values = quantities * (cos_coefficients(codes, strikes, initial_stock_price, a, b, u) @ weights)
+
+    return np.bincount(owner, weights=leg_values, minlength=len(strategies))
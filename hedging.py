@@ -0,0 +1,127 @@
+import numpy as np
+from stocks_base import Stock
+from options_base import LEG_CODES
+from black_scholes import leg_values, norm_cdf
+
+class HedgingReport:
+
+    def __init__(self, errors, rebalances, cost):
+
+        self.errors = errors
+
+        self.rebalances = rebalances
+
+        self.cost = cost
+
+    @property
+    def mean(self):
+
+        return np.mean(self.errors)
+
+    @property
+    def std(self):
+
+        return np.std(self.errors)
+
+    def quantile(self, q):
+
+        return np.quantile(self.errors, q)
+
+    def __repr__(self):
+
+        return (f'Hedging error ({self.rebalances} rebalances, cost {self.cost:.2%}): '
+                f'mean {self.mean:.4f}, std {self.std:.4f}, 1% {self.quantile(.01):.4f}')
+
+def _strategy_delta(codes, strikes, quantities, spots, tau, risk_free, sigma):
+    """
+    Black-Scholes delta of the strategy before expiry, sharing log(S) and the
+    volatility term across legs.
+    """
+
+    log_spots = np.log(spots)
+
+    vol = sigma * np.sqrt(tau)
+
+    carry = (risk_free + .5 * sigma**2) * tau
+
+    delta = np.zeros_like(spots)
+
+    for code, strike, quantity in zip(codes, strikes, quantities):
+
+        if code == LEG_CODES['Stock']:
+
+            delta += quantity
+
+            continue
+
+        n_d1 = norm_cdf((log_spots - np.log(strike) + carry) / vol)
+
+        delta += quantity * (n_d1 - 1. if code == LEG_CODES['Put'] else n_d1)
+
+    return delta
+
+def hedge_errors(strategy, initial_stock_price, risk_free, sigma, plazo, n, rebalances, cost=0.,
+                 drift=None, hedge_sigma=None):
+    """
+    Hedging error of n paths for a long strategy delta-hedged with stock at
+    equally spaced dates, all paths and dates handled as arrays.
+
+    The strategy is bought at its Black-Scholes value, the stock hedge is
+    rebalanced to minus the strategy delta paying a proportional transaction
+    cost and unwound at expiry, and cash accrues at the risk-free rate. The
+    error is reported in today's money.
+
+    Argumentos
+    ----------
+    drift: float, optional
+        Real-world drift of the paths, defaults to the risk-free rate.
+    hedge_sigma: float, optional
+        Volatility used for the hedge ratios, defaults to sigma.
+    """
+
+    codes, strikes, quantities = strategy.leg_arrays()
+
+    if any(pos.plazo not in (None, plazo) for pos in getattr(strategy, 'positions', [])):
+
+        raise ValueError('Hedging simulations need all the legs to expire at plazo.')
+
+    drift = risk_free if drift is None else drift
+
+    hedge_sigma = sigma if hedge_sigma is None else hedge_sigma
+
+    times = np.linspace(0., plazo, rebalances + 1)
+
+    st = np.vstack([np.full((1, n), float(initial_stock_price)),
+                    Stock.sim_gbm_path(initial_stock_price, drift, sigma, times[1:], n)])
+
+    discount = np.exp(-risk_free * times / 365.)[:, None]
+
+    tau = ((plazo - times[:-1]) / 365.)[:, None]
+
+    delta = _strategy_delta(codes, strikes, quantities, st[:-1], tau, risk_free, hedge_sigma)
+
+    value = quantities @ leg_values(codes, strikes, initial_stock_price, plazo / 365., risk_free, hedge_sigma, discount=True)
+
+    hedge_gains = -np.sum(delta * np.diff(st * discount, axis=0), axis=0)
+
+    trades = np.diff(np.vstack([np.zeros((1, n)), -delta, np.zeros((1, n))]), axis=0)
+
+    costs = cost * np.sum(np.abs(trades) * st * discount, axis=0)
+
+    return strategy.payoff(st[-1]) * discount[-1, 0] - value + hedge_gains - costs
+
+def simulate_hedge(strategy, initial_stock_price, risk_free, sigma, plazo, n, rebalances, cost=0.,
+                   drift=None, hedge_sigma=None, block_size=100_000, seed=None):
+    """
+    Runs hedge_errors over blocks of paths and collects the hedging error
+    distribution.
+    """
+
+    if seed:
+        np.random.seed(seed)
+
+    errors = np.concatenate([hedge_errors(strategy, initial_stock_price, risk_free, sigma, plazo,
+                                          min(block_size, n - start), rebalances, cost, drift, hedge_sigma)
+                             for start in range(0, n, block_size)])
+
+    return HedgingReport(errors, rebalances, cost)
@@ -0,0 +1,435 @@
+import math
+import queue
+import threading
+import numpy as np
+from options_base import LEG_CODES
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+NUMBA_AVAILABLE = numba is not None
+
+_STOCK, _PUT = LEG_CODES['Stock'], LEG_CODES['Put']
+
+_local = threading.local()
+
+def net_legs(codes, strikes, quantities):
+    """
+    Merges legs with the same code and strike and drops the ones netting to
+    zero, so each distinct payoff is evaluated once.
+    """
+
+    legs, inverse = np.unique(np.column_stack([codes, strikes]), axis=0, return_inverse=True)
+
+    netted = np.bincount(inverse.ravel(), weights=quantities, minlength=len(legs))
+
+    keep = netted != 0.
+
+    return legs[keep, 0].astype(int), legs[keep, 1], netted[keep]
+
+class DrawProducer:
+    """
+    Background thread filling a ring of preallocated buffers with the
+    standard normals of np.random.default_rng(seed), chunk by chunk, while
+    the consumer works on the buffers already filled. Iterating yields the
+    filled chunks in order; a buffer is handed back to the producer when the
+    consumer asks for the next one.
+
+    The chunks are exactly those a sequential loop over the same generator
+    would draw, so pipelined results are identical to sequential ones.
+    NumPy releases the GIL while filling and in ufuncs, so both sides run
+    concurrently.
+    """
+
+    def __init__(self, buffers, n, seed=None):
+
+        self._buffers = buffers
+
+        self._n = n
+
+        self._seed = seed
+
+        self._free = queue.Queue()
+
+        self._ready = queue.Queue()
+
+        for j in range(len(buffers)):
+
+            self._free.put(j)
+
+        self._thread = threading.Thread(target=self._produce, daemon=True)
+
+    def _produce(self):
+
+        try:
+
+            rng = np.random.default_rng(self._seed)
+
+            chunk_size = len(self._buffers[0])
+
+            for start in range(0, self._n, chunk_size):
+
+                j = self._free.get()
+
+                if j is None:
+                    break
+
+                m = min(chunk_size, self._n - start)
+
+                rng.standard_normal(m, dtype=self._buffers[j].dtype, out=self._buffers[j][:m])
+
+                self._ready.put((j, m))
+
+        except Exception as error:
+
+            self._ready.put(error)
+
+        self._ready.put(None)
+
+    def __enter__(self):
+
+        self._thread.start()
+
+        return self
+
+    def __exit__(self, *exc):
+
+        self._free.put(None)
+
+        self._thread.join()
+
+    def __iter__(self):
+
+        while True:
+
+            item = self._ready.get()
+
+            if item is None:
+                return
+
+            if isinstance(item, Exception):
+                raise item
+
+            j, m = item
+
+            yield self._buffers[j][:m]
+
+            self._free.put(j)
+
+class PricingKernel:
+    """
+    Fused simulate-and-reduce Monte Carlo over preallocated chunk buffers.
+
+    Each chunk of standard normals is drawn straight into a work buffer,
+    turned into terminal prices in place and reduced leg by leg into running
+    sums, so no full-size temporaries are allocated and the buffers are
+    reused across calls.
+
+    With dtype=np.float32 draws, prices and payoffs are single precision,
+    halving memory traffic, while sums are accumulated in float64 (pairwise
+    within a chunk, exactly rounded across chunks).
+    """
+
+    def __init__(self, chunk_size=262_144, dtype=np.float64):
+
+        self.chunk_size = chunk_size
+
+        self.dtype = np.dtype(dtype)
+
+        self._st = np.empty(chunk_size, dtype=self.dtype)
+
+        self._work = np.empty(chunk_size, dtype=self.dtype)
+
+        self._ring = []
+
+    def ring(self, depth):
+        """
+        Preallocated draw buffers for a DrawProducer, kept across calls.
+        """
+
+        while len(self._ring) < depth:
+
+            self._ring.append(np.empty(self.chunk_size, dtype=self.dtype))
+
+        return self._ring[:depth]
+
+    def __repr__(self):
+
+        return f'PricingKernel: chunks of {self.chunk_size} {self.dtype.name}'
+
+    def _reduce(self, st, work, codes, strikes, quantities):
+        """
+        Sum over the chunk of the payoff of the netted legs.
+        """
+
+        total = 0.
+
+        for code, strike, quantity in zip(codes, strikes, quantities):
+
+            if code == LEG_CODES['Put']:
+
+                np.subtract(strike, st, out=work)
+
+            else:
+
+                np.subtract(st, strike, out=work)
+
+            if code != LEG_CODES['Stock']:
+
+                np.maximum(work, 0, out=work)
+
+            total += quantity * work.sum(dtype=np.float64)
+
+        return total
+
+    def _transform_reduce(self, st, s0, drift, vol, codes, strikes, quantities):
+        """
+        Turns a chunk of normals into terminal prices in place and returns the
+        sum of the payoff over it.
+        """
+
+        np.multiply(st, vol, out=st)
+
+        np.add(st, drift, out=st)
+
+        np.exp(st, out=st)
+
+        np.multiply(st, s0, out=st)
+
+        return self._reduce(st, self._work[:len(st)], codes, strikes, quantities)
+
+    def expected_payoff(self, codes, strikes, quantities, s0, risk_free, sigma, plazo, n, seed=None, draws=None,
+                        pipeline=False, depth=3):
+        """
+        Mean payoff of the legs over n GBM terminal prices, simulated chunk by
+        chunk with np.random.default_rng(seed) or read from precomputed draws.
+        With pipeline=True the normals are drawn by a DrawProducer thread into
+        a ring of depth buffers, overlapping generation with evaluation.
+        """
+
+        codes, strikes, quantities = net_legs(codes, strikes, quantities)
+
+        t = plazo / 365.
+
+        scalar = self.dtype.type
+
+        params = (scalar(s0), scalar((risk_free - .5 * sigma**2) * t), scalar(sigma * np.sqrt(t)), codes,
+                  strikes.astype(self.dtype), quantities)
+
+        sums = []
+
+        if pipeline and draws is None:
+
+            with DrawProducer(self.ring(depth), n, seed) as producer:
+
+                for st in producer:
+
+                    sums.append(self._transform_reduce(st, *params))
+
+            return math.fsum(sums) / n
+
+        rng = np.random.default_rng(seed) if draws is None else None
+
+        for start in range(0, n, self.chunk_size):
+
+            m = min(self.chunk_size, n - start)
+
+            st = self._st[:m]
+
+            if draws is None:
+
+                rng.standard_normal(m, dtype=self.dtype, out=st)
+
+            else:
+
+                np.copyto(st, draws[start:start + m], casting='unsafe')
+
+            sums.append(self._transform_reduce(st, *params))
+
+        return math.fsum(sums) / n
+
+def _path_payoff(st, codes, strikes, quantities):
+
+    total = 0.
+
+    for j in range(len(codes)):
+
+        diff = st - strikes[j] if codes[j] != _PUT else strikes[j] - st
+
+        if codes[j] != _STOCK and diff < 0.:
+            diff = 0.
+
+        total += quantities[j] * diff
+
+    return total
+
+def _draws_sum(z, s0, drift, vol, codes, strikes, quantities):
+
+    total = 0.
+
+    for i in numba.prange(len(z)):
+
+        total += _path_payoff(s0 * np.exp(drift + vol * z[i]), codes, strikes, quantities)
+
+    return total
+
+def _simulate_sum(n, seeds, block, s0, drift, vol, codes, strikes, quantities):
+    """
+    Every block of paths seeds its own generator with seeds[block number], so
+    the sum does not depend on the number of threads.
+    """
+
+    n_blocks = len(seeds)
+
+    sums = np.zeros(n_blocks)
+
+    for b in numba.prange(n_blocks):
+
+        np.random.seed(seeds[b])
+
+        total = 0.
+
+        for i in range(b * block, min(n, (b + 1) * block)):
+
+            total += _path_payoff(s0 * np.exp(drift + vol * np.random.standard_normal()), codes, strikes, quantities)
+
+        sums[b] = total
+
+    return sums.sum()
+
+if NUMBA_AVAILABLE:
+
+    _path_payoff = numba.njit(cache=True)(_path_payoff)
+
+    _draws_sum = numba.njit(parallel=True, cache=True)(_draws_sum)
+
+    _simulate_sum = numba.njit(parallel=True, cache=True)(_simulate_sum)
+
+def numba_expected_payoff(codes, strikes, quantities, s0, risk_free, sigma, plazo, n, seed=None, draws=None,
+                          block=65_536):
+    """
+    Mean payoff of the legs from a compiled single-pass, multi-threaded loop
+    that draws each normal, builds the terminal price, evaluates the payoff
+    and accumulates it without intermediate arrays (requires numba).
+
+    With the same draws it matches PricingKernel.expected_payoff up to
+    rounding; without them the normals come from numba's own generators.
+    """
+
+    if not NUMBA_AVAILABLE:
+
+        raise ImportError('The numba backend requires numba.')
+
+    codes, strikes, quantities = net_legs(codes, strikes, quantities)
+
+    t = plazo / 365.
+
+    args = (float(s0), (risk_free - .5 * sigma**2) * t, sigma * np.sqrt(t), codes.astype(np.int64),
+            strikes.astype(np.float64), quantities.astype(np.float64))
+
+    if draws is not None:
+
+        return _draws_sum(np.ascontiguousarray(draws, dtype=np.float64), *args) / n
+
+    seeds = np.random.SeedSequence(seed).generate_state((n + block - 1) // block)
+
+    return _simulate_sum(n, seeds, block, *args) / n
+
+def check_backends(derivative, risk_free, sigma, plazo, n=200_000, seed=0, rtol=1e-9):
+    """
+    Prices the derivative with the NumPy and numba backends on the same draws.
+
+    Retorno
+    -------
+    equivalent: bool
+    numpy_price: float
+    numba_price: float
+    """
+
+    z = np.random.default_rng(seed).standard_normal(n)
+
+    numpy_price = fused_price(derivative, risk_free, sigma, plazo, n, draws=z, backend='numpy')
+
+    numba_price = fused_price(derivative, risk_free, sigma, plazo, n, draws=z, backend='numba')
+
+    return bool(np.isclose(numba_price, numpy_price, rtol=rtol, atol=0.)), numpy_price, numba_price
+
+def validate_precision(derivative, risk_free, sigma, plazo, n=1_000_000, seed=0, dtype=np.float32, tolerance=.1,
+                       chunk_size=262_144):
+    """
+    Prices the derivative in float64 and in a lower precision on the same
+    draws and checks that the difference stays below tolerance times the
+    Monte Carlo standard error, i.e. that rounding is negligible next to
+    sampling noise.
+
+    Retorno
+    -------
+    accurate: bool
+    price_64: float
+    price_low: float
+    std_error: float
+    """
+
+    z = np.random.default_rng(seed).standard_normal(n)
+
+    price_64 = fused_price(derivative, risk_free, sigma, plazo, n, draws=z, chunk_size=chunk_size, backend='numpy')
+
+    price_low = fused_price(derivative, risk_free, sigma, plazo, n, draws=z, chunk_size=chunk_size, dtype=dtype,
+                            backend='numpy')
+
+    st = derivative.initial_stock_price * np.exp((risk_free - .5 * sigma**2) * plazo / 365. +
+                                                 sigma * np.sqrt(plazo / 365.) * z)
+
+    std_error = np.std(derivative.payoff(st)) / np.sqrt(n)
+
+    return bool(abs(price_low - price_64) <= tolerance * std_error), price_64, price_low, std_error
+
+def get_kernel(chunk_size=262_144, dtype=np.float64):
+    """
+    PricingKernel kept per thread and configuration, so repeated pricing
+    reuses the same buffers.
+    """
+
+    kernels = _local.__dict__.setdefault('kernels', {})
+
+    key = (chunk_size, np.dtype(dtype))
+
+    if key not in kernels:
+
+        kernels[key] = PricingKernel(chunk_size, dtype)
+
+    return kernels[key]
+
+def fused_price(derivative, risk_free, sigma, plazo, n, seed=None, draws=None, chunk_size=262_144, dtype=np.float64,
+                backend='auto', pipeline=None):
+    """
+    Expected payoff of a vanilla option or single-expiry strategy with the
+    fused kernel. backend='auto' uses the compiled numba loop for float64
+    when numba is importable and the NumPy kernel otherwise.
+
+    The NumPy kernel draws normals in a background thread when pipeline is
+    True, or by default when there are more than four chunks; results are the
+    same either way.
+    """
+
+    if backend not in ('auto', 'numpy', 'numba'):
+
+        raise ValueError(f'Backend "{backend}" not recognized.')
+
+    codes, strikes, quantities = derivative.leg_arrays()
+
+    if backend == 'numba' or (backend == 'auto' and NUMBA_AVAILABLE and np.dtype(dtype) == np.float64):
+
+        return numba_expected_payoff(codes, strikes, quantities, derivative.initial_stock_price, risk_free, sigma,
+                                     plazo, n, seed, draws)
+
+    kernel = get_kernel(chunk_size, dtype)
+
+    if pipeline is None:
+
+        pipeline = n > 4 * chunk_size
+
+    return kernel.expected_payoff(codes, strikes, quantities, derivative.initial_stock_price, risk_free, sigma,
+                                  plazo, n, seed, draws, pipeline)
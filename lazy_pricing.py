@@ -0,0 +1,194 @@
+import numpy as np
+
+_batches = []
+
+def active_batch():
+
+    return _batches[-1] if _batches else None
+
+class LazyPrice:
+    """
+    Placeholder returned by get_price inside a PricingBatch. The price is
+    computed, together with every other pending call, the first time it is
+    needed: when converted with float or np.asarray, formatted, compared or
+    used in arithmetic. Reading derivative_price of the priced strategy
+    (e.g. through max_profit) also forces the evaluation.
+    """
+
+    def __init__(self, batch, derivative):
+
+        self._batch = batch
+
+        self._derivative = derivative
+
+        self._price = None
+
+    def __repr__(self):
+
+        return f'LazyPrice: {"pending" if self._price is None else self._price}'
+
+    def __float__(self):
+
+        return float(self.result())
+
+    def __format__(self, spec):
+
+        return format(self.result(), spec)
+
+    def __array__(self, dtype=None, copy=None):
+
+        return np.asarray(self.result(), dtype=dtype)
+
+    def __add__(self, other):
+
+        return self.result() + other
+
+    def __radd__(self, other):
+
+        return other + self.result()
+
+    def __sub__(self, other):
+
+        return self.result() - other
+
+    def __rsub__(self, other):
+
+        return other - self.result()
+
+    def __mul__(self, other):
+
+        return self.result() * other
+
+    def __rmul__(self, other):
+
+        return other * self.result()
+
+    def __truediv__(self, other):
+
+        return self.result() / other
+
+    def __rtruediv__(self, other):
+
+        return other / self.result()
+
+    def __neg__(self):
+
+        return -self.result()
+
+    def __abs__(self):
+
+        return abs(self.result())
+
+    def __eq__(self, other):
+
+        return self.result() == other
+
+    def __lt__(self, other):
+
+        return self.result() < other
+
+    def __le__(self, other):
+
+        return self.result() <= other
+
+    def __gt__(self, other):
+
+        return self.result() > other
+
+    def __ge__(self, other):
+
+        return self.result() >= other
+
+    __hash__ = None
+
+    @property
+    def done(self):
+
+        return self._price is not None
+
+    def result(self):
+
+        if self._price is None:
+
+            self._batch.evaluate()
+
+        return self._price
+
+class PricingBatch:
+    """
+    Context manager deferring Strategy.get_price calls. Inside the block each
+    call returns a LazyPrice; pending calls are grouped by market parameters
+    and each group is priced through one Book, so duplicate legs are priced
+    once and, with engine='mc', all the strategies of a group share a single
+    simulation. Everything pending is evaluated when the block exits or when
+    a result is first requested.
+
+    Only strategies priced with engine='mc' or 'analytic' and no cache or
+    draws are deferred; other calls are priced immediately as usual.
+
+    Example
+    -------
+    with PricingBatch():
+        prices = [s.get_price(.05, .2, 30, 100_000, 100.) for s in strategies]
+    """
+
+    engines = ('mc', 'analytic')
+
+    def __init__(self):
+
+        self._groups = {}
+
+    def __enter__(self):
+
+        _batches.append(self)
+
+        return self
+
+    def __exit__(self, *exc):
+
+        _batches.pop()
+
+        if exc[0] is None:
+
+            self.evaluate()
+
+    def __len__(self):
+
+        return sum(len(group) for group in self._groups.values())
+
+    def accepts(self, derivative, engine, cache, draws):
+
+        return (engine in self.engines and cache is None and draws is None and hasattr(derivative, 'positions')
+                and len([u for u in derivative.underlyings if u is not None]) <= 1)
+
+    def submit(self, derivative, risk_free, sigma, plazo, n, seed, engine):
+
+        key = tuple(float(p) for p in (derivative.initial_stock_price, risk_free, sigma, plazo)) + (n, seed, engine)
+
+        price = LazyPrice(self, derivative)
+
+        self._groups.setdefault(key, []).append(price)
+
+        derivative.derivative_price = price
+
+        return price
+
+    def evaluate(self):
+
+        from book import Book
+
+        groups, self._groups = self._groups, {}
+
+        for (s0, risk_free, sigma, plazo, n, seed, engine), pending in groups.items():
+
+            book = Book([price._derivative for price in pending], plazo)
+
+            prices = np.abs(book.get_price(risk_free, sigma, s0, n, seed, engine))
+
+            for price, value in zip(pending, prices):
+
+                price._price = value
+
+                if price._derivative._derivative_price is price:
+
+                    price._derivative.derivative_price = value
@@ -0,0 +1,213 @@
+import numpy as np
+from stocks_base import Stock
+
+class MLMCResult:
+
+    def __init__(self, price, variance, bias, samples, means, variances, costs):
+
+        self.price = price
+
+        self.variance = variance
+
+        self.bias = bias
+
+        self.samples = samples
+
+        self.means = means
+
+        self.variances = variances
+
+        self.costs = costs
+
+    @property
+    def rmse(self):
+
+        return np.sqrt(self.variance + self.bias**2)
+
+    @property
+    def levels(self):
+
+        return len(self.samples)
+
+    @property
+    def cost(self):
+        """
+        Total number of simulated time steps.
+        """
+
+        return float(np.sum(self.samples * self.costs))
+
+    def __repr__(self):
+
+        return (f'MLMC price {self.price:.6f} (rmse {self.rmse:.2e}), {self.levels} levels, '
+                f'samples {self.samples.tolist()}')
+
+def terminal_payoff(strategy):
+    """
+    Payoff functional of a European strategy on the last column of the paths.
+    """
+
+    return lambda paths: strategy.payoff(paths[:, -1])
+
+def average_payoff(strategy):
+    """
+    Payoff of the strategy on the arithmetic average of the monitoring dates.
+    """
+
+    return lambda paths: strategy.payoff(paths[:, 1:].mean(axis=1))
+
+def barrier_payoff(strategy, barrier, direction='down'):
+    """
+    Payoff of the strategy at expiry, knocked out when the path crosses the
+    barrier on a monitoring date.
+    """
+
+    if direction not in ('down', 'up'):
+
+        raise ValueError('The barrier direction must be "down" or "up".')
+
+    def payoff(paths):
+
+        alive = paths.min(axis=1) > barrier if direction == 'down' else paths.max(axis=1) < barrier
+
+        return strategy.payoff(paths[:, -1]) * alive
+
+    return payoff
+
+def level_sums(payoff, level, n, s0, risk_free, sigma, plazo, base_steps=1, refinement=2, scheme='exact', rng=None,
+               block_size=1_000_000):
+    """
+    Sum and sum of squares over n samples of the level correction: the payoff
+    on base_steps * refinement**level steps minus, from level 1 on, the
+    payoff on the coarser grid driven by the same Brownian increments.
+    """
+
+    rng = np.random.default_rng(rng)
+
+    steps = base_steps * refinement**level
+
+    dt = plazo / 365. / steps
+
+    sums = np.zeros(2)
+
+    paths_per_block = max(1, block_size // steps)
+
+    for start in range(0, n, paths_per_block):
+
+        dw = rng.standard_normal((min(paths_per_block, n - start), steps)) * np.sqrt(dt)
+
+        y = payoff(Stock.sim_gbm_steps(s0, risk_free, sigma, plazo, dw, scheme))
+
+        if level > 0:
+
+            coarse_dw = dw.reshape(len(dw), steps // refinement, refinement).sum(axis=2)
+
+            y = y - payoff(Stock.sim_gbm_steps(s0, risk_free, sigma, plazo, coarse_dw, scheme))
+
+        sums += y.sum(), np.sum(y**2)
+
+    return sums
+
+def _decay_rate(values, refinement):
+    """
+    Rate at which values fall per level, from a log-linear fit.
+    """
+
+    levels = np.arange(1, len(values))
+
+    logs = np.log(np.maximum(values[1:], 1e-300)) / np.log(refinement)
+
+    return np.clip(-np.polyfit(levels, logs, 1)[0], .5, 10.)
+
+def mlmc_price(payoff, s0, risk_free, sigma, plazo, rmse, n_initial=10_000, base_steps=1, refinement=2, min_levels=3,
+               max_levels=12, scheme='exact', seed=None, block_size=1_000_000):
+    """
+    Multilevel Monte Carlo estimate of the expected payoff of a path
+    functional under GBM dynamics, to a target root mean square error.
+
+    Level l simulates paths on base_steps * refinement**l steps and estimates
+    the difference with the level below on coupled paths. Samples per level
+    follow the observed variances and costs, and levels are added until the
+    bias estimated from the decay of the corrections is below rmse / sqrt(2).
+
+    Argumentos
+    ----------
+    payoff: callable or Strategy
+        Function mapping paths of shape (n, steps + 1) to payoffs, e.g.
+        barrier_payoff(strategy, 90.). A Strategy or option is priced on
+        its terminal payoff.
+
+    Retorno
+    -------
+    result: MLMCResult
+    """
+
+    if hasattr(payoff, 'payoff'):
+
+        payoff = terminal_payoff(payoff)
+
+    rng = np.random.default_rng(seed)
+
+    n_levels = min_levels
+
+    samples = np.zeros(n_levels, dtype=np.int64)
+
+    sums = np.zeros((n_levels, 2))
+
+    costs = base_steps * refinement**np.arange(n_levels) * np.r_[1., np.full(n_levels - 1, 1. + 1. / refinement)]
+
+    extra = np.full(n_levels, n_initial, dtype=np.int64)
+
+    bias = 0.
+
+    while np.any(extra > 0):
+
+        for level in np.flatnonzero(extra):
+
+            sums[level] += level_sums(payoff, level, int(extra[level]), s0, risk_free, sigma, plazo, base_steps,
+                                      refinement, scheme, rng, block_size)
+
+            samples[level] += extra[level]
+
+        means = np.abs(sums[:, 0] / samples)
+
+        variances = np.maximum(sums[:, 1] / samples - (sums[:, 0] / samples)**2, 0.)
+
+        alpha = _decay_rate(means, refinement)
+
+        beta = _decay_rate(variances, refinement)
+
+        optimal = np.ceil(2. / rmse**2 * np.sqrt(variances / costs) * np.sum(np.sqrt(variances * costs)))
+
+        extra = np.maximum(optimal - samples, 0).astype(np.int64)
+
+        if np.all(extra <= .01 * samples):
+
+            bias = max(means[-1], means[-2] / refinement**alpha) / (refinement**alpha - 1.)
+
+            if bias <= rmse / np.sqrt(2.) or n_levels == max_levels:
+
+                break
+
+            n_levels += 1
+
+            samples = np.r_[samples, 0]
+
+            sums = np.vstack([sums, np.zeros(2)])
+
+            costs = np.r_[costs, costs[-1] * refinement]
+
+            variances = np.r_[variances, variances[-1] / refinement**beta]
+
+            optimal = np.ceil(2. / rmse**2 * np.sqrt(variances / costs) * np.sum(np.sqrt(variances * costs)))
+
+            extra = np.maximum(optimal - samples, 0).astype(np.int64)
+
+            extra[-1] = max(extra[-1], n_initial)
+
+    means = sums[:, 0] / samples
+
+    variances = np.maximum(sums[:, 1] / samples - means**2, 0.)
+
+    return MLMCResult(float(np.sum(means)), float(np.sum(variances / samples)), float(bias), samples, means,
+                      variances, costs)
@@ -0,0 +1,102 @@
+import numpy as np
+
+def factorize_correlation(corr, method='cholesky'):
+    """
+    Returns a matrix L with L @ L.T equal to the correlation matrix.
+
+    method='eigen' clips negative eigenvalues, so it also accepts estimated
+    matrices that are only approximately positive semidefinite.
+    """
+
+    corr = np.asarray(corr, dtype=float)
+
+    if method == 'cholesky':
+
+        return np.linalg.cholesky(corr)
+
+    elif method == 'eigen':
+
+        eigenvalues, eigenvectors = np.linalg.eigh(corr)
+
+        return eigenvectors * np.sqrt(np.clip(eigenvalues, 0., None))
+
+    else:
+
+        raise ValueError(f'Factorization method "{method}" not recognized.')
+
+class CorrelatedGBM:
+
+    def __init__(self, underlyings, s0, sigma, corr, method='cholesky'):
+
+        self.underlyings = list(underlyings)
+
+        self.s0 = np.asarray(s0, dtype=float)
+
+        self.sigma = np.asarray(sigma, dtype=float)
+
+        self.corr = np.asarray(corr, dtype=float)
+
+        if self.corr.shape != (len(self.underlyings), len(self.underlyings)):
+
+            raise ValueError('The correlation matrix must be square with one row per underlying.')
+
+        self._factor = factorize_correlation(self.corr, method)
+
+    def iter_blocks(self, risk_free, plazo, n, chunk_size=1_000_000, seed=None, dtype=np.float64):
+        """
+        Yields terminal prices in blocks of shape (chunk, n_underlyings).
+        """
+
+        rng = np.random.default_rng(seed)
+
+        t = plazo / 365.
+
+        drift = ((risk_free - .5 * self.sigma**2) * t).astype(dtype)
+
+        factor = (self._factor * (self.sigma * np.sqrt(t))[:, None]).T.astype(dtype)
+
+        s0 = self.s0.astype(dtype)
+
+        for start in range(0, n, chunk_size):
+
+            z = rng.standard_normal((min(chunk_size, n - start), len(self.underlyings)), dtype=dtype)
+
+            log_returns = z @ factor
+
+            log_returns += drift
+
+            np.exp(log_returns, out=log_returns)
+
+            log_returns *= s0
+
+            yield log_returns
+
+    def simulate(self, risk_free, plazo, n, chunk_size=1_000_000, seed=None, dtype=np.float64):
+
+        return np.concatenate(list(self.iter_blocks(risk_free, plazo, n, chunk_size, seed, dtype)))
+
+    def get_price(self, strategy, risk_free, plazo, n, chunk_size=1_000_000, seed=None, dtype=np.float64):
+        """
+        Expected payoff of a strategy whose positions reference several
+        underlyings, from one joint simulation.
+        """
+
+        missing = [name for name in strategy.underlyings if name is not None and name not in self.underlyings]
+
+        if missing:
+
+            raise ValueError(f'Underlyings {missing} are not simulated by this model.')
+
+        if any(pos.plazo not in (None, plazo) for pos in strategy.positions):
+
+            raise ValueError('Multi-asset pricing needs all the legs to expire at plazo.')
+
+        total = 0.
+
+        for st in self.iter_blocks(risk_free, plazo, n, chunk_size, seed, dtype):
+
+            total += np.sum(strategy.payoff_multi(st, self.underlyings), dtype=np.float64)
+
+        strategy.derivative_price = np.abs(total / n)
+
+        return strategy.derivative_price
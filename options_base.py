@@ -5,6 +5,44 @@ import matplotlib.pyplot as plt
 
 plt.style.use('ggplot')
 
+LEG_CODES = {'Stock': 0, 'Call': 1, 'Put': 2}
+
+def instrument_leg(instrument):
+    """
+    Returns the (code, strike) pair describing a linear, call or put payoff.
+    Stocks are treated as forwards struck at their purchase price.
+    """
+
+    if instrument.type == 'Stock':
+
+        return LEG_CODES['Stock'], instrument.s0
+
+    return LEG_CODES[instrument.type], instrument.strike
+
+def draws_signature(draws):
+    """
+    Identifies memory-mapped draws by file and by the position of the view
+    within it (byte offset, shape and strides), so that different slices of
+    one file get different cache keys. Draws that are not backed by a file
+    have no signature.
+    """
+
+    filename = getattr(draws, 'filename', None)
+
+    if filename is None:
+
+        return None
+
+    root = draws
+
+    while isinstance(root.base, np.ndarray):
+
+        root = root.base
+
+    offset = draws.__array_interface__['data'][0] - root.__array_interface__['data'][0]
+
+    return (filename, int(getattr(root, 'offset', 0)) + offset, draws.shape, draws.strides, draws.dtype.str)
+
 class EuroDerivative(ABC):
 
     def __init__(self, initial_stock_price=None):
@@ -29,6 +67,10 @@ class EuroDerivative(ABC):
     @property
     def derivative_price(self):
 
+        if hasattr(self._derivative_price, 'result'):
+
+            self._derivative_price = self._derivative_price.result()
+
         if self._derivative_price is None: 
 
             raise ValueError('You should first get the price of the '
@@ -42,19 +84,145 @@ class EuroDerivative(ABC):
 
         self._derivative_price = value 
 
-    def get_price(self, risk_free, sigma, plazo, n, initial_stock_price=None, seed=None):
+    def get_price(self, risk_free, sigma, plazo, n, initial_stock_price=None, seed=None, engine='mc', cache=None, draws=None):
+        """
+        Prices the derivative as the expected payoff under GBM dynamics.
+
+        engine='mc' averages the payoff over n simulated terminal prices,
+        engine='fused' does the same chunk by chunk on reusable buffers
+        (kernels.PricingKernel) and engine='fused32' in single precision with
+        float64 sums, engine='sampled' uses stratified and importance
+        sampling chosen from the strikes (sampling.sample_price),
+        engine='cos' uses the Fourier-cosine expansion, engine='pde' a
+        Crank-Nicolson solve and engine='analytic' the Black-Scholes formulas
+        (n is ignored by the last three). With a PricingCache, prices are looked
+        up by the signature of the legs and the parameters before computing.
+
+        draws are precomputed standard normals for engine='mc', 'fused' or
+        'fused32', such as the memory-mapped arrays of a SimulationStore; they
+        replace n and seed.
+
+        Inside a lazy_pricing.PricingBatch the call returns a LazyPrice that is
+        evaluated later together with the other pending calls.
+
+        Strategies on several underlyings need one spot and volatility per
+        underlying and must be priced with multi_asset.CorrelatedGBM.
+        """
+
+        if len([u for u in getattr(self, 'underlyings', []) if u is not None]) > 1:
+
+            raise ValueError('Strategies on several underlyings must be priced with multi_asset.CorrelatedGBM.')
+
+        if draws is not None and engine not in ('mc', 'fused', 'fused32'):
+
+            raise ValueError(f'Precomputed draws cannot be used with engine "{engine}".')
 
         if initial_stock_price:
 
             self.initial_stock_price = initial_stock_price
 
-        if seed:
-            np.random.seed(seed)
+        from lazy_pricing import active_batch
+
+        batch = active_batch()
+
+        if batch is not None and batch.accepts(self, engine, cache, draws):
+
+            return batch.submit(self, risk_free, sigma, plazo, n, seed, engine)
+
+        if draws is not None:
+
+            n, seed = draws.shape[-1], draws_signature(draws)
 
-        self.derivative_price = np.abs(np.mean(self.payoff(Stock.sim_gbm(self.initial_stock_price, risk_free, sigma, plazo, n))))
+            if seed is None:
+
+                cache = None
+
+        if cache is not None:
+
+            key = cache.key(self, risk_free, sigma, plazo, n, seed, engine)
+
+            price = cache.get(key)
+
+            if price is not None:
+
+                self.derivative_price = price
+
+                return self.derivative_price
+
+        self.derivative_price = np.abs(self._expected_payoff(risk_free, sigma, plazo, n, seed, engine, draws))
+
+        if cache is not None:
+
+            cache.put(key, self.derivative_price)
         
         return self.derivative_price 
 
+    def _expected_payoff(self, risk_free, sigma, plazo, n, seed, engine, draws=None):
+
+        if engine == 'mc':
+
+            if seed and draws is None:
+                np.random.seed(seed)
+
+            return np.mean(self.payoff(Stock.sim_gbm(self.initial_stock_price, risk_free, sigma, plazo, n, draws)))
+
+        elif engine in ('fused', 'fused32'):
+
+            from kernels import fused_price
+
+            return fused_price(self, risk_free, sigma, plazo, n, seed, draws,
+                               dtype=np.float32 if engine == 'fused32' else np.float64)
+
+        elif engine == 'sampled':
+
+            from sampling import sample_price
+
+            return sample_price(self, risk_free, sigma, plazo, n, seed=seed)[0]
+
+        elif engine == 'cos':
+
+            from fourier_pricing import GBMModel, cos_price
+
+            return cos_price(self, GBMModel(risk_free, sigma), plazo)
+
+        elif engine == 'pde':
+
+            from pde_pricing import pde_solve
+
+            return pde_solve(self, risk_free, sigma, plazo).at(self.initial_stock_price)[0]
+
+        elif engine == 'analytic':
+
+            from black_scholes import analytic_price
+
+            return analytic_price(self, risk_free, sigma, plazo)
+
+        else:
+
+            raise ValueError(f'Pricing engine "{engine}" not recognized.')
+
+    def get_term_structure(self, risk_free, sigma, plazos, n, initial_stock_price=None, seed=None):
+        """
+        Prices the derivative at several maturities from one set of paths
+        extended through the sorted expiries. Every leg is assumed to expire
+        at each maturity, so positions with their own expiry are rejected.
+        """
+
+        if any(pos.plazo is not None for pos in getattr(self, 'positions', [])):
+
+            raise ValueError('A term structure cannot be computed for positions with their own expiry.')
+
+        if initial_stock_price:
+
+            self.initial_stock_price = initial_stock_price
+
+        if seed:
+            np.random.seed(seed)
+
+        st = Stock.sim_gbm_path(self.initial_stock_price, risk_free, sigma, plazos, n)
+
+        return np.abs(np.array([np.mean(self.payoff(st_plazo)) for st_plazo in st]))
+
     @abstractmethod
     def payoff(self, st):
         """
@@ -72,6 +240,15 @@ class EuroDerivative(ABC):
         """
         pass
 
+    def leg_arrays(self):
+        """
+        Array form of the payoff: leg codes, strikes and quantities.
+        """
+
+        code, strike = instrument_leg(self)
+
+        return np.array([code]), np.array([strike], dtype=float), np.ones(1)
+
     def plot_payoff(self, min_val, max_val):
 
         price_range = np.arange(min_val, max_val, 0.01)
@@ -123,12 +300,16 @@ class Put(VanillaOption):
 
 class Position:
 
-    def __init__(self, quantity, instrument):
+    def __init__(self, quantity, instrument, underlying=None, plazo=None):
 
         self.__quantity = quantity
 
         self.__instrument = instrument 
 
+        self.__underlying = underlying
+
+        self.plazo = plazo
+
     @property
     def quantity(self):
 
@@ -151,6 +332,32 @@ class Position:
 
         self.__instrument = instrument 
 
+    @property
+    def underlying(self):
+
+        return self.__underlying
+
+    @underlying.setter
+    def underlying(self, value):
+
+        self.__underlying = value
+
+    @property
+    def plazo(self):
+        """
+        Days to the expiry of this leg, None if it expires with the strategy.
+        """
+
+        return self.__plazo
+
+    @plazo.setter
+    def plazo(self, value):
+
+        if value is not None and value < 0:
+            raise ValueError('The expiry of a position cannot be negative.')
+
+        self.__plazo = value
+
     def get_type(self):
 
         return self.instrument.type 
@@ -175,6 +382,8 @@ class Strategy(EuroDerivative):
 
         self._positions = []
 
+        self._frozen = None
+
     @property 
     def strategy_name(self):
 
@@ -191,7 +400,9 @@ class Strategy(EuroDerivative):
 
         pos_string = [f'{"Long " if pos.quantity > 0 else "Short "}' + 
                       f'{abs(pos.quantity)} {pos.get_type()} @ ' + 
-                      f'{pos.get_strike():.2f}' for pos in self.positions]
+                      f'{pos.get_strike():.2f}' + 
+                      f'{"" if pos.underlying is None else f" on {pos.underlying}"}' + 
+                      f'{"" if pos.plazo is None else f" ({pos.plazo}d)"}' for pos in self.positions]
 
         end_line = [20*'-']
 
@@ -199,12 +410,31 @@ class Strategy(EuroDerivative):
 
         return '\n'.join(string_to_print)
 
+    @property
+    def underlyings(self):
+        """
+        Distinct underlyings referenced by the positions, in order of appearance.
+        Positions without an explicit underlying are reported as None.
+        """
+
+        return list(dict.fromkeys(pos.underlying for pos in self.positions))
+
     def add_position(self, positions):
 
         if isinstance(positions, list):
-            for q,i in positions:
+            for position in positions:
 
-                self._positions.append(Position(q,i))
+                position = Position(*position)
+
+                if self._frozen is not None:
+
+                    self._apply_leg(position, 1.)
+
+                self._positions.append(position)
+
+            if self._frozen is not None:
+
+                self._update_frozen_price()
 
         else:
             raise TypeError('The positions argument must be a list')
@@ -215,12 +445,229 @@ class Strategy(EuroDerivative):
         else:
             self._positions.append(pos)
         """
+    def remove_position(self, index):
+
+        position = self._positions.pop(index)
+
+        if self._frozen is not None:
+
+            self._apply_leg(position, -1.)
+
+            self._update_frozen_price()
+
+        return position
+
+    def restrike_position(self, index, strike):
+        """
+        Replaces the option of a position with one of the same type at a new
+        strike, keeping quantity, underlying and expiry.
+        """
+
+        old = self._positions[index]
+
+        new = Position(old.quantity, type(old.instrument)(strike), old.underlying, old.plazo)
+
+        self._positions[index] = new
+
+        if self._frozen is not None:
+
+            self._apply_leg(old, -1.)
+
+            self._apply_leg(new, 1.)
+
+            self._update_frozen_price()
+
+    def freeze_simulation(self, risk_free, sigma, plazo, n, initial_stock_price=None, seed=None):
+        """
+        Simulates once and keeps the draws together with per-path running
+        totals of payoff, pathwise delta and likelihood-ratio gamma. Later
+        add_position, remove_position and restrike_position calls update the
+        price, its standard error and the greeks from the changed leg only.
+        """
+
+        if initial_stock_price:
+
+            self.initial_stock_price = initial_stock_price
+
+        if any(pos.plazo is not None and pos.plazo != plazo for pos in self.positions):
+
+            raise ValueError('Incremental repricing needs all the legs to share one expiry.')
+
+        if seed:
+            np.random.seed(seed)
+
+        z = np.random.normal(size=n)
+
+        self._frozen = {'z': z, 'st': Stock.sim_gbm(self.initial_stock_price, risk_free, sigma, plazo, n, z),
+                        'vol': sigma * np.sqrt(plazo / 365.), 'payoff': np.zeros(n), 'delta': np.zeros(n),
+                        'gamma': np.zeros(n), 'legs': {}, 'plazo': plazo}
+
+        for pos in self.positions:
+
+            self._apply_leg(pos, 1.)
+
+        self._update_frozen_price()
+
+        return self.derivative_price
+
+    def thaw_simulation(self):
+
+        self._frozen = None
+
+    def _apply_leg(self, position, sign):
+
+        frozen = self._frozen
+
+        if position.plazo is not None and position.plazo != frozen['plazo']:
+
+            raise ValueError('Incremental repricing needs all the legs to share one expiry.')
+
+        st, s0 = frozen['st'], self.initial_stock_price
+
+        code, strike = instrument_leg(position.instrument)
+
+        payoff = position.quantity * position.instrument.payoff(st)
+
+        if code == LEG_CODES['Call']:
+
+            slope = (st > strike) * position.quantity
+
+        elif code == LEG_CODES['Put']:
+
+            slope = (st < strike) * -position.quantity
+
+        else:
+
+            slope = np.full(st.shape, float(position.quantity))
+
+        delta = slope * st / s0
+
+        frozen['payoff'] += sign * payoff
+
+        frozen['delta'] += sign * delta
+
+        frozen['gamma'] += sign * delta * (frozen['z'] / frozen['vol'] - 1.) / s0
+
+        if sign > 0:
+
+            frozen['legs'][id(position)] = (np.mean(payoff), np.var(payoff))
+
+        else:
+
+            frozen['legs'].pop(id(position), None)
+
+    def _update_frozen_price(self):
+
+        self.derivative_price = np.abs(np.mean(self._frozen['payoff']))
+
+    def _require_frozen(self):
+
+        if self._frozen is None:
+
+            raise ValueError('Call freeze_simulation before asking for incremental results.')
+
+        return self._frozen
+
+    @property
+    def price_std_error(self):
+
+        payoff = self._require_frozen()['payoff']
+
+        return np.std(payoff) / np.sqrt(len(payoff))
+
+    @property
+    def greeks(self):
+        """
+        Monte Carlo delta and gamma on the frozen simulation.
+        """
+
+        frozen = self._require_frozen()
+
+        return np.mean(frozen['delta']), np.mean(frozen['gamma'])
+
+    @property
+    def leg_stats(self):
+        """
+        Mean and variance of each leg's payoff on the frozen simulation.
+        """
+
+        legs = self._require_frozen()['legs']
+
+        return [legs[id(pos)] for pos in self.positions]
+
     def payoff(self, st):
 
         payoffs = np.sum(np.array([pos.quantity * pos.instrument.payoff(st) for pos in self.positions]),axis=0)
         
         return payoffs
 
+    def _expected_payoff(self, risk_free, sigma, plazo, n, seed, engine, draws=None):
+
+        if engine == 'analytic' or all(pos.plazo is None for pos in self.positions):
+
+            return super()._expected_payoff(risk_free, sigma, plazo, n, seed, engine, draws)
+
+        if engine != 'mc':
+
+            raise ValueError('Positions with their own expiry can only be priced with engine="mc" or "analytic".')
+
+        if seed and draws is None:
+            np.random.seed(seed)
+
+        plazos = self.leg_plazos(plazo)
+
+        st = Stock.sim_gbm_path(self.initial_stock_price, risk_free, sigma, plazos, n, draws)
+
+        return np.mean(self.payoff_expiries(st, plazos, plazo))
+
+    def leg_plazos(self, plazo):
+        """
+        Sorted distinct expiries of the legs, defaulting to plazo.
+        """
+
+        return sorted({plazo if pos.plazo is None else pos.plazo for pos in self.positions})
+
+    def payoff_expiries(self, st, plazos, plazo):
+        """
+        Payoff of legs with different expiries, each evaluated on the row of
+        st (as returned by Stock.sim_gbm_path) matching its own expiry.
+        """
+
+        row = {p: j for j, p in enumerate(plazos)}
+
+        return np.sum(np.array([pos.quantity * pos.instrument.payoff(st[row[plazo if pos.plazo is None else pos.plazo]])
+                                for pos in self.positions]), axis=0)
+
+    def payoff_multi(self, st, underlyings):
+        """
+        Payoff when positions are on different underlyings.
+
+        Argumentos
+        ----------
+        st: np.ndarray
+            Terminal prices of shape (n, len(underlyings)).
+        underlyings: list
+            Name of the underlying in each column of st. Positions without an
+            explicit underlying are evaluated on the first column.
+        """
+
+        column = {name: j for j, name in enumerate(underlyings)}
+
+        return np.sum(np.array([pos.quantity * pos.instrument.payoff(st[:, column.get(pos.underlying, 0)])
+                                for pos in self.positions]), axis=0)
+
+    def leg_arrays(self):
+
+        legs = [instrument_leg(pos.instrument) for pos in self.positions]
+
+        codes = np.array([code for code, _ in legs], dtype=int)
+
+        strikes = np.array([strike for _, strike in legs], dtype=float)
+
+        quantities = np.array([pos.quantity for pos in self.positions], dtype=float)
+
+        return codes, strikes, quantities
+
     def plot_payoff(self, min_val, max_val):
  
         _, ax = super().plot_payoff(min_val, max_val)
@@ -229,6 +676,20 @@ class Strategy(EuroDerivative):
 
         plt.show()
 
+    def plot_value_surface(self, min_val, max_val, days, risk_free, sigma, plazo):
+        """
+        Plots the value of the strategy against spot at each of the given days
+        (elapsed from today) together with its payoff at expiry.
+        """
+
+        from black_scholes import plot_value_surface
+
+        _, ax = plot_value_surface(self, min_val, max_val, days, risk_free, sigma, plazo)
+
+        ax.set_title(self.strategy_name, fontsize=16)
+
+        plt.show()
+
 if __name__ == '__main__':
 
     positions = []
@@ -564,7 +564,7 @@ class BearCallLadder(Strategy):
 
         super().__init__('Bear Call Ladder')
 
-        self,initial_stock_price = initial_stock_price
+        self.initial_stock_price = initial_stock_price
 
         delta_1 = initial_stock_price * 0.1
 
@@ -1221,7 +1221,7 @@ class PutRatioBackspread(Strategy):
 
         return max_loss
 
-class RatioCallSpread(Spread):
+class RatioCallSpread(Strategy):
 
     def __init__(self, initial_stock_price, strike_1, strike_2, n_short=2, n_long=1):
 
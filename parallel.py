@@ -0,0 +1,121 @@
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from book import as_book, instrument_payoffs
+from stocks_base import Stock
+
+_attached = {}
+
+def _create_shared(array):
+
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+
+    return shm
+
+def _attach(specs):
+    """
+    Pool initializer: maps the shared blocks as arrays once per worker,
+    without copying them.
+    """
+
+    for name, (shm_name, shape, dtype) in specs.items():
+
+        shm = shared_memory.SharedMemory(name=shm_name)
+
+        _attached[name] = (shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf))
+
+def _partial_sums(start, stop, chunk_size):
+    """
+    Sum of each instrument's payoff over st[row, start:stop], row being the
+    instrument's expiry; only this small vector travels back to the parent.
+    """
+
+    st = _attached['st'][1]
+
+    codes = _attached['codes'][1]
+
+    strikes = _attached['strikes'][1]
+
+    rows = _attached['rows'][1]
+
+    sums = np.zeros(len(codes))
+
+    for row in np.unique(rows):
+
+        legs = np.flatnonzero(rows == row)
+
+        for chunk in range(start, stop, chunk_size):
+
+            sums[legs] += instrument_payoffs(codes[legs], strikes[legs],
+                                             st[row, chunk:min(chunk + chunk_size, stop)]).sum(axis=0)
+
+    return sums
+
+def price_parallel(strategies, risk_free, sigma, plazo, n, initial_stock_price, n_workers=4, seed=None,
+                   tasks_per_worker=4):
+    """
+    Expected payoff of every strategy from one set of simulated paths,
+    evaluated across a process pool. Legs with their own expiry are valued on
+    the row of their expiry, all rows following the same Brownian paths as in
+    Book.get_price.
+
+    The terminal prices and the netted instrument legs live in
+    multiprocessing.shared_memory blocks that workers attach zero-copy; each
+    task returns only per-instrument payoff sums, which are mapped back to
+    the strategies through the book exposure.
+    """
+
+    book = as_book(strategies, plazo)
+
+    book._single_underlying()
+
+    expiries, rows = np.unique(book.expiries, return_inverse=True)
+
+    rng = np.random.default_rng(seed)
+
+    blocks = {}
+
+    try:
+
+        blocks['st'] = shared_memory.SharedMemory(create=True, size=len(expiries) * n * 8)
+
+        st = np.ndarray((len(expiries), n), dtype=np.float64, buffer=blocks['st'].buf)
+
+        for start in range(0, n, 1_000_000):
+
+            m = min(1_000_000, n - start)
+
+            st[:, start:start + m] = Stock.sim_gbm_path(initial_stock_price, risk_free, sigma, expiries, m,
+                                                        rng.standard_normal((len(expiries), m)))
+
+        arrays = {'codes': book.codes, 'strikes': book.strikes, 'rows': rows.ravel().astype(np.int64)}
+
+        for name, array in arrays.items():
+
+            blocks[name] = _create_shared(array)
+
+        specs = {name: (blocks[name].name, array.shape, array.dtype) for name, array in arrays.items()}
+
+        specs['st'] = (blocks['st'].name, st.shape, np.float64)
+
+        bounds = np.linspace(0, n, n_workers * tasks_per_worker + 1).astype(int)
+
+        chunk_size = max(1, 4_000_000 // max(len(book.codes), 1))
+
+        with ProcessPoolExecutor(n_workers, initializer=_attach, initargs=(specs,)) as pool:
+
+            sums = sum(pool.map(_partial_sums, bounds[:-1], bounds[1:], [chunk_size] * (len(bounds) - 1)))
+
+        del st
+
+    finally:
+
+        for shm in blocks.values():
+
+            shm.close()
+
+            shm.unlink()
+
+    return book.to_strategies(sums / n)
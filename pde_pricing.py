@@ -0,0 +1,166 @@
+import numpy as np
+
+try:
+    from scipy.linalg import solve_banded
+except ImportError:
+    solve_banded = None
+
+class PDEResult:
+
+    def __init__(self, spots, values, delta, gamma, theta):
+
+        self.spots = spots
+
+        self.values = values
+
+        self.delta = delta
+
+        self.gamma = gamma
+
+        self.theta = theta
+
+    def at(self, spot):
+        """
+        Value, delta and gamma interpolated at the given spot(s).
+        """
+
+        return (np.interp(spot, self.spots, self.values),
+                np.interp(spot, self.spots, self.delta),
+                np.interp(spot, self.spots, self.gamma))
+
+def _generator(spots, risk_free, sigma, discount):
+    """
+    Tridiagonal Black-Scholes operator in time to expiry, with S = 0
+    absorbing and zero gamma at the upper boundary, in the banded layout of
+    scipy.linalg.solve_banded: rows hold the upper, main and lower diagonals.
+    """
+
+    h = spots[1] - spots[0]
+
+    m = len(spots)
+
+    rate = risk_free if discount else 0.
+
+    diffusion = .5 * sigma**2 * spots**2 / h**2
+
+    convection = .5 * risk_free * spots / h
+
+    bands = np.zeros((3, m))
+
+    i = np.arange(1, m - 1)
+
+    bands[2, i - 1] = diffusion[i] - convection[i]
+
+    bands[1, i] = -2. * diffusion[i] - rate
+
+    bands[0, i + 1] = diffusion[i] + convection[i]
+
+    bands[1, 0] = -rate
+
+    bands[2, -2] = -2. * convection[-1]
+
+    bands[1, -1] = 2. * convection[-1] - rate
+
+    return bands
+
+def _banded_dot(bands, values):
+    """
+    Product of a tridiagonal matrix in banded layout with a vector.
+    """
+
+    result = bands[1] * values
+
+    result[:-1] += bands[0, 1:] * values[1:]
+
+    result[1:] += bands[2, :-1] * values[:-1]
+
+    return result
+
+def _thomas(bands, rhs):
+    """
+    Solves a tridiagonal system in banded layout with the Thomas algorithm.
+    """
+
+    upper, main, lower = bands[0, 1:], bands[1].copy(), bands[2, :-1]
+
+    rhs = rhs.copy()
+
+    for k in range(1, len(main)):
+
+        w = lower[k - 1] / main[k - 1]
+
+        main[k] -= w * upper[k - 1]
+
+        rhs[k] -= w * rhs[k - 1]
+
+    x = np.empty_like(rhs)
+
+    x[-1] = rhs[-1] / main[-1]
+
+    for k in range(len(main) - 2, -1, -1):
+
+        x[k] = (rhs[k] - upper[k] * x[k + 1]) / main[k]
+
+    return x
+
+def _solve_tridiagonal(bands, rhs):
+
+    if solve_banded is not None:
+
+        return solve_banded((1, 1), bands, rhs, check_finite=False)
+
+    return _thomas(bands, rhs)
+
+def pde_solve(derivative, risk_free, sigma, plazo, s_max=None, n_spots=401, n_steps=200,
+              rannacher_steps=2, discount=False):
+    """
+    Solves the Black-Scholes PDE once for the combined payoff of a derivative
+    or strategy with Crank-Nicolson, starting with fully implicit half steps
+    (Rannacher smoothing) to damp the oscillations from the strike kinks.
+    Each step is a tridiagonal solve, O(n_spots).
+
+    Like EuroDerivative.get_price, values are not discounted unless
+    discount=True.
+
+    Retorno
+    -------
+    result: PDEResult
+        Value, delta, gamma and theta (per year) at every grid spot.
+    """
+
+    if s_max is None:
+
+        _, strikes, _ = derivative.leg_arrays()
+
+        s_max = 4. * max(np.max(strikes), derivative.initial_stock_price or 0.)
+
+    spots = np.linspace(0., s_max, n_spots)
+
+    dt = plazo / 365. / n_steps
+
+    A = _generator(spots, risk_free, sigma, discount)
+
+    identity = np.zeros_like(A)
+
+    identity[1] = 1.
+
+    values = derivative.payoff(spots).astype(float)
+
+    rannacher_steps = min(rannacher_steps, n_steps)
+
+    for _ in range(2 * rannacher_steps):
+
+        previous, values = values, _solve_tridiagonal(identity - .5 * dt * A, values)
+
+    for _ in range(n_steps - rannacher_steps):
+
+        previous, values = values, _solve_tridiagonal(identity - .5 * dt * A,
+                                                      values + .5 * dt * _banded_dot(A, values))
+
+    delta = np.gradient(values, spots)
+
+    gamma = np.gradient(delta, spots)
+
+    theta = (previous - values) / (dt if n_steps > rannacher_steps else .5 * dt)
+
+    return PDEResult(spots, values, delta, gamma, theta)
@@ -0,0 +1,209 @@
+import hashlib
+import sqlite3
+import time
+import numpy as np
+
+def strategy_signature(derivative):
+    """
+    Canonical hash of the legs of a vanilla option or strategy: quantities of
+    identical (type, strike, underlying, expiry) legs are netted and the legs
+    sorted, so equivalent structures share a signature whatever their name or
+    the order their positions were added in.
+    """
+
+    codes, strikes, quantities = derivative.leg_arrays()
+
+    if hasattr(derivative, 'positions'):
+
+        extras = [(str(pos.underlying), repr(None if pos.plazo is None else float(pos.plazo)))
+                  for pos in derivative.positions]
+
+    else:
+
+        extras = [('None', 'None')]
+
+    netted = {}
+
+    for code, strike, quantity, (underlying, plazo) in zip(codes, strikes, quantities, extras):
+
+        leg = (int(code), repr(float(strike)), underlying, plazo)
+
+        netted[leg] = netted.get(leg, 0.) + float(quantity)
+
+    legs = sorted((leg, repr(quantity)) for leg, quantity in netted.items() if quantity != 0.)
+
+    return hashlib.sha256(repr(legs).encode()).hexdigest()
+
+class PricingCache:
+    """
+    Persistent SQLite store of prices keyed by strategy signature and pricing
+    parameters, shared across processes and restarts.
+
+    Entries older than max_age seconds are dropped and, beyond max_entries,
+    the least recently used ones are evicted. Eviction runs once every
+    batch_size puts, so the store can briefly hold up to batch_size entries
+    more than max_entries, and access times of hits are written in batches
+    of batch_size (or on put, evict and close).
+    """
+
+    def __init__(self, path, max_entries=1_000_000, max_age=None, batch_size=1000):
+
+        self.path = path
+
+        self.max_entries = max_entries
+
+        self.max_age = max_age
+
+        self.batch_size = batch_size
+
+        self.hits = 0
+
+        self.misses = 0
+
+        self._puts = 0
+
+        self._accessed = {}
+
+        self._connection = sqlite3.connect(path, timeout=30.)
+
+        self._connection.execute('PRAGMA journal_mode=WAL')
+
+        self._connection.execute('CREATE TABLE IF NOT EXISTS prices '
+                                 '(key TEXT PRIMARY KEY, price REAL, created REAL, accessed REAL)')
+
+        self._connection.execute('CREATE INDEX IF NOT EXISTS prices_accessed ON prices (accessed)')
+
+        self._connection.commit()
+
+        self._count = len(self)
+
+    def __len__(self):
+
+        return self._connection.execute('SELECT COUNT(*) FROM prices').fetchone()[0]
+
+    def __repr__(self):
+
+        return f'PricingCache: {self.path}, {len(self)} entries, hit rate {self.hit_rate:.1%}'
+
+    @property
+    def hit_rate(self):
+
+        total = self.hits + self.misses
+
+        return self.hits / total if total else 0.
+
+    @property
+    def stats(self):
+
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hit_rate, 'entries': len(self)}
+
+    def key(self, derivative, risk_free, sigma, plazo, n, seed, engine):
+
+        params = (derivative.initial_stock_price, risk_free, sigma, plazo, n, seed, engine)
+
+        params = tuple(float(p) if isinstance(p, (int, float, np.number)) else p for p in params)
+
+        return strategy_signature(derivative) + hashlib.sha256(repr(params).encode()).hexdigest()[:32]
+
+    def get(self, key):
+
+        now = time.time()
+
+        row = self._connection.execute('SELECT price, created FROM prices WHERE key = ?', (key,)).fetchone()
+
+        if row is None or (self.max_age is not None and now - row[1] > self.max_age):
+
+            self.misses += 1
+
+            return None
+
+        self._accessed[key] = now
+
+        if len(self._accessed) >= self.batch_size:
+
+            self.flush()
+
+        self.hits += 1
+
+        return row[0]
+
+    def _write_accessed(self):
+
+        if self._accessed:
+
+            self._connection.executemany('UPDATE prices SET accessed = ? WHERE key = ?',
+                                         [(accessed, key) for key, accessed in self._accessed.items()])
+
+            self._accessed = {}
+
+    def flush(self):
+        """
+        Writes the pending access times of cache hits.
+        """
+
+        self._write_accessed()
+
+        self._connection.commit()
+
+    def put(self, key, price):
+
+        now = time.time()
+
+        self._accessed.pop(key, None)
+
+        self._write_accessed()
+
+        inserted = self._connection.execute('INSERT OR IGNORE INTO prices VALUES (?, ?, ?, ?)',
+                                            (key, float(price), now, now)).rowcount
+
+        if not inserted:
+
+            self._connection.execute('UPDATE prices SET price = ?, created = ?, accessed = ? WHERE key = ?',
+                                     (float(price), now, now, key))
+
+        self._connection.commit()
+
+        self._count += inserted
+
+        self._puts += 1
+
+        if self._puts % self.batch_size == 0 and (self.max_age is not None or self._count > self.max_entries):
+
+            self.evict()
+
+    def evict(self):
+
+        self._write_accessed()
+
+        if self.max_age is not None:
+
+            self._connection.execute('DELETE FROM prices WHERE created < ?', (time.time() - self.max_age,))
+
+        self._count = len(self)
+
+        excess = self._count - self.max_entries
+
+        if excess > 0:
+
+            self._connection.execute('DELETE FROM prices WHERE key IN '
+                                     '(SELECT key FROM prices ORDER BY accessed LIMIT ?)', (excess,))
+
+            self._count -= excess
+
+        self._connection.commit()
+
+    def clear(self):
+
+        self._accessed = {}
+
+        self._connection.execute('DELETE FROM prices')
+
+        self._connection.commit()
+
+        self._count = 0
+
+    def close(self):
+
+        self.flush()
+
+        self._connection.close()
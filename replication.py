@@ -0,0 +1,116 @@
+import numpy as np
+from options_base import Strategy, Call, Put, instrument_leg
+from stocks_base import Stock
+from black_scholes import analytic_price, leg_values
+
+try:
+    from scipy import sparse
+    from scipy.optimize import linprog
+except ImportError:
+    linprog = None
+
+def replication_grid(strikes, initial_stock_price):
+    """
+    Spot grid on which piecewise-linear payoffs with kinks at the strikes are
+    fully determined: zero, every strike and a point beyond the last one.
+    """
+
+    strikes = np.unique(np.asarray(strikes, dtype=float))
+
+    return np.unique(np.concatenate([[0.], strikes, [2. * max(strikes[-1], initial_stock_price)]]))
+
+def replicate(target, strikes, initial_stock_price, risk_free, sigma, plazo, grid=None, tolerance=0.01,
+              templates=None, include_vanillas=True, include_stock=True, max_quantity=100., sparsity=1e-4):
+    """
+    Cheapest combination of calls, puts and stock at the given strikes (and/or
+    of pre-built strategy templates) whose payoff matches the target within
+    the given tolerance at every grid point.
+
+    The problem is solved as a sparse linear program: minimise the analytic
+    cost of the legs plus a small L1 penalty favouring few legs, subject to
+    |payoff - target| <= tolerance on the grid.
+
+    Argumentos
+    ----------
+    target: callable or array_like
+        Target payoff as a function of S_T, or its values on the grid.
+    templates: list of Strategy, optional
+        Strategies that can be bought or sold as a whole.
+
+    Retorno
+    -------
+    strategy: Strategy
+        Replicating strategy, with fractional quantities if needed.
+    """
+
+    if linprog is None:
+
+        raise ImportError('The replication solver requires scipy.')
+
+    strikes = np.unique(np.asarray(strikes, dtype=float))
+
+    if grid is None:
+
+        grid = replication_grid(strikes, initial_stock_price)
+
+    grid = np.asarray(grid, dtype=float)
+
+    y = target(grid) if callable(target) else np.asarray(target, dtype=float)
+
+    candidates = []
+
+    if include_vanillas:
+
+        candidates += [Call(k) for k in strikes] + [Put(k) for k in strikes]
+
+    if include_stock:
+
+        candidates.append(Stock(initial_stock_price))
+
+    candidates += list(templates or [])
+
+    if not candidates:
+
+        raise ValueError('There are no instruments to replicate the target with.')
+
+    payoffs = sparse.csc_matrix(np.column_stack([c.payoff(grid) for c in candidates]))
+
+    costs = np.array([analytic_price(c, risk_free, sigma, plazo, initial_stock_price) if isinstance(c, Strategy) else
+                      leg_values(*instrument_leg(c), initial_stock_price, plazo / 365., risk_free, sigma)
+                      for c in candidates])
+
+    # w = w_long - w_short, both non-negative, so the L1 penalty stays linear.
+    A = sparse.vstack([sparse.hstack([payoffs, -payoffs]), sparse.hstack([-payoffs, payoffs])]).tocsc()
+
+    b = np.concatenate([y + tolerance, tolerance - y])
+
+    c = np.concatenate([costs, -costs]) + sparsity
+
+    result = linprog(c, A_ub=A, b_ub=b, bounds=(0., max_quantity), method='highs')
+
+    if not result.success:
+
+        raise ValueError(f'The target payoff could not be replicated: {result.message}')
+
+    weights = np.round(result.x[:len(candidates)] - result.x[len(candidates):], 8)
+
+    strategy = Strategy('Replication')
+
+    strategy.initial_stock_price = initial_stock_price
+
+    for weight, candidate in zip(weights, candidates):
+
+        if abs(weight) < 1e-9:
+
+            continue
+
+        if isinstance(candidate, Strategy):
+
+            strategy.add_position([(weight * pos.quantity, pos.instrument, pos.underlying, pos.plazo)
+                                   for pos in candidate.positions])
+
+        else:
+
+            strategy.add_position([(weight, candidate)])
+
+    return strategy
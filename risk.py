@@ -0,0 +1,214 @@
+import numpy as np
+from stocks_base import Stock
+from book import as_book
+
+class QuantileSketch:
+    """
+    Mergeable log-bucket quantile sketch (DDSketch-style) for many columns at
+    once. Every value is stored in a bucket whose bounds are within the given
+    relative accuracy, so quantiles and tail means carry the same relative
+    error regardless of how many values were streamed.
+
+    Counts are int64, so they stay exact up to 9e18 values per column, and
+    updates are binned a slice of columns at a time to bound the temporary
+    index arrays.
+    """
+
+    def __init__(self, n_columns, relative_accuracy=0.01, min_value=1e-6, max_value=1e9):
+
+        self.n_columns = n_columns
+
+        self.relative_accuracy = relative_accuracy
+
+        self.min_value = min_value
+
+        self._gamma = (1. + relative_accuracy) / (1. - relative_accuracy)
+
+        self._log_gamma = np.log(self._gamma)
+
+        self._min_key = int(np.floor(np.log(min_value) / self._log_gamma))
+
+        self._n_keys = int(np.ceil(np.log(max_value) / self._log_gamma)) - self._min_key + 1
+
+        self.counts = np.zeros((n_columns, 2 * self._n_keys + 1), dtype=np.int64)
+
+    @property
+    def n_bins(self):
+
+        return 2 * self._n_keys + 1
+
+    def _bins(self, values):
+
+        magnitude = np.abs(values)
+
+        keys = np.ceil(np.log(np.maximum(magnitude, self.min_value)) / self._log_gamma).astype(np.int64)
+
+        keys = np.clip(keys - self._min_key, 0, self._n_keys - 1)
+
+        bins = np.where(values > 0., self._n_keys + 1 + keys, self._n_keys - 1 - keys)
+
+        return np.where(magnitude < self.min_value, self._n_keys, bins)
+
+    def _representatives(self):
+
+        keys = np.arange(self._n_keys) + self._min_key
+
+        positive = 2. * self._gamma**keys / (self._gamma + 1.)
+
+        return np.concatenate([-positive[::-1], [0.], positive])
+
+    def update(self, values):
+        """
+        Adds a block of values of shape (n, n_columns).
+        """
+
+        values = np.asarray(values, dtype=float).reshape(-1, self.n_columns)
+
+        step = max(1, 2**22 // self.n_bins)
+
+        for start in range(0, self.n_columns, step):
+
+            columns = min(step, self.n_columns - start)
+
+            bins = self._bins(values[:, start:start + columns]) + np.arange(columns) * self.n_bins
+
+            self.counts[start:start + columns] += np.bincount(bins.ravel(), minlength=columns * self.n_bins).reshape(columns, self.n_bins)
+
+    def merge(self, other):
+
+        if other.counts.shape != self.counts.shape or other.relative_accuracy != self.relative_accuracy:
+
+            raise ValueError('Only sketches with the same layout can be merged.')
+
+        self.counts += other.counts
+
+        return self
+
+    def _lower_tail(self, q):
+
+        cumulative = np.cumsum(self.counts, axis=1)
+
+        rank = q * cumulative[:, -1]
+
+        bins = np.argmax(cumulative >= rank[:, None], axis=1)
+
+        return cumulative, rank, bins
+
+    def quantile(self, q):
+
+        _, _, bins = self._lower_tail(q)
+
+        return self._representatives()[bins]
+
+    def tail_mean(self, q):
+        """
+        Mean of the values below the q-quantile, taking the quantile bucket
+        only partially.
+        """
+
+        cumulative, rank, bins = self._lower_tail(q)
+
+        representatives = self._representatives()
+
+        below = np.arange(self.n_bins)[None, :] < bins[:, None]
+
+        total_below = np.sum(np.where(below, self.counts * representatives, 0.), axis=1)
+
+        rows = np.arange(self.n_columns)
+
+        count_below = cumulative[rows, bins] - self.counts[rows, bins]
+
+        partial = (rank - count_below) * representatives[bins]
+
+        return (total_below + partial) / np.maximum(rank, 1.)
+
+class RiskReport:
+
+    def __init__(self, level, var, es, book_var, book_es):
+
+        self.level = level
+
+        self.var = var
+
+        self.es = es
+
+        self.book_var = book_var
+
+        self.book_es = book_es
+
+    def __repr__(self):
+
+        return (f'Risk @ {self.level:.1%}: {len(self.var)} strategies, '
+                f'book VaR {self.book_var:.4f}, book ES {self.book_es:.4f}')
+
+def block_rows(n_columns, max_values=4_000_000):
+    """
+    Rows per block so that a block of n_columns holds about max_values.
+    """
+
+    return max(1, max_values // max(n_columns, 1))
+
+def pnl_blocks(strategies, risk_free, sigma, plazo, n, initial_stock_price, premiums=None, block_size=None, seed=None):
+    """
+    Yields P&L blocks of shape (block, len(strategies)), all strategies sharing
+    the same simulated paths (common random numbers), each leg paying at its
+    own expiry along the path. The legs are netted into a Book so each
+    distinct instrument is evaluated once per block.
+
+    By default blocks hold about four million values of the widest array
+    built per block (strategies or instruments), so the full P&L matrix is
+    never stored whatever the number of strategies.
+
+    P&L is the payoff at expiry minus the premium, which defaults to the
+    analytic expected payoff of each strategy.
+    """
+
+    book = as_book(strategies, plazo)
+
+    if premiums is None:
+
+        premiums = book.get_price(risk_free, sigma, initial_stock_price)
+
+    if block_size is None:
+
+        block_size = block_rows(max(len(book), len(book.instruments)))
+
+    if seed:
+        np.random.seed(seed)
+
+    expiries = np.unique(book.expiries)
+
+    for start in range(0, n, block_size):
+
+        st = Stock.sim_gbm_path(initial_stock_price, risk_free, sigma, expiries, min(block_size, n - start))
+
+        yield book.payoffs(st) - premiums
+
+def var_es(strategies, risk_free, sigma, plazo, n, initial_stock_price, level=0.99, premiums=None,
+           block_size=None, seed=None, relative_accuracy=0.01):
+    """
+    Streams simulated P&L through quantile sketches and returns the Value at
+    Risk and Expected Shortfall (as positive losses) of each strategy and of
+    the book formed by holding all of them.
+
+    By default blocks hold about four million P&L values, whatever the
+    number of strategies.
+    """
+
+    book = as_book(strategies, plazo)
+
+    if block_size is None:
+
+        block_size = block_rows(max(len(book) + 1, len(book.instruments)))
+
+    sketch = QuantileSketch(len(book) + 1, relative_accuracy)
+
+    for pnl in pnl_blocks(book, risk_free, sigma, plazo, n, initial_stock_price, premiums, block_size, seed):
+
+        sketch.update(np.column_stack([pnl, pnl.sum(axis=1)]))
+
+    var = -sketch.quantile(1. - level)
+
+    es = -sketch.tail_mean(1. - level)
+
+    return RiskReport(level, var[:-1], es[:-1], var[-1], es[-1])
@@ -0,0 +1,141 @@
+import numpy as np
+from black_scholes import norm_ppf
+
+def strike_scores(derivative, risk_free, sigma, plazo, max_score=6.):
+    """
+    Standard normal draws at which the terminal price reaches each strike of
+    the derivative, i.e. where its payoff bends.
+    """
+
+    _, strikes, _ = derivative.leg_arrays()
+
+    t = plazo / 365.
+
+    scores = (np.log(strikes / derivative.initial_stock_price) - (risk_free - .5 * sigma**2) * t) / (sigma * np.sqrt(t))
+
+    return np.clip(np.unique(scores), -max_score, max_score)
+
+def _weighted_payoffs(derivative, z, shift, drift, vol):
+    """
+    Payoffs on normals drawn with mean shift, times the likelihood ratio of
+    the standard normal to the shifted one.
+    """
+
+    st = derivative.initial_stock_price * np.exp(drift + vol * z)
+
+    return np.reshape(derivative.payoff(st.ravel()), z.shape) * np.exp(-shift * z + .5 * shift**2)
+
+def choose_shift(derivative, risk_free, sigma, plazo, n_pilot=20_000, seed=None):
+    """
+    Drift shift of the normals with the smallest importance-sampling variance,
+    among no shift and the strike scores.
+
+    The pilot sample is drawn from an equal mixture of the candidate shifts,
+    so that tails where only a deep out-of-the-money leg pays are visited,
+    and the second moment of every candidate is estimated from it by
+    reweighting.
+    """
+
+    rng = np.random.default_rng(seed)
+
+    t = plazo / 365.
+
+    drift, vol = (risk_free - .5 * sigma**2) * t, sigma * np.sqrt(t)
+
+    candidates = np.unique(np.concatenate([[0.], strike_scores(derivative, risk_free, sigma, plazo)]))
+
+    z = rng.standard_normal(n_pilot) + rng.choice(candidates, n_pilot)
+
+    payoffs = derivative.payoff(derivative.initial_stock_price * np.exp(drift + vol * z))
+
+    densities = np.exp(-.5 * (z[:, None] - candidates[None, :])**2)
+
+    mixture = densities.mean(axis=1)
+
+    second_moments = np.mean((payoffs**2 * np.exp(-.5 * z**2) / mixture)[:, None] * np.exp(-.5 * z**2)[:, None] /
+                             densities, axis=0)
+
+    return candidates[np.argmin(second_moments)]
+
+def sample_price(derivative, risk_free, sigma, plazo, n, initial_stock_price=None, seed=None, method='auto',
+                 shift=None, per_stratum=2, block_size=100_000):
+    """
+    Expected payoff with variance reduction for payoffs driven by rare
+    terminal prices, such as ladders, condors and seagulls.
+
+    method='stratified' splits the normal quantiles into n / per_stratum
+    equally likely strata, method='importance' shifts the mean of the normals
+    and weights each path by its likelihood ratio, and method='auto' does
+    both, with the shift chosen from the strikes by choose_shift (zero when
+    no shift helps).
+
+    Argumentos
+    ----------
+    shift: float
+        Mean of the sampled normals, overriding the automatic choice.
+
+    Retorno
+    -------
+    price: float
+    std_error: float
+    """
+
+    if method not in ('auto', 'stratified', 'importance'):
+
+        raise ValueError(f'Sampling method "{method}" not recognized.')
+
+    if per_stratum < 2:
+
+        raise ValueError('At least two paths per stratum are needed to estimate the error.')
+
+    if any(pos.plazo not in (None, plazo) for pos in getattr(derivative, 'positions', [])):
+
+        raise ValueError('Stratified and importance sampling need all the legs to share one expiry.')
+
+    if initial_stock_price:
+
+        derivative.initial_stock_price = initial_stock_price
+
+    rng = np.random.default_rng(seed)
+
+    if shift is None:
+
+        shift = 0. if method == 'stratified' else choose_shift(derivative, risk_free, sigma, plazo, seed=rng)
+
+    t = plazo / 365.
+
+    drift, vol = (risk_free - .5 * sigma**2) * t, sigma * np.sqrt(t)
+
+    if method == 'importance':
+
+        total, squares = 0., 0.
+
+        for start in range(0, n, block_size):
+
+            y = _weighted_payoffs(derivative, rng.standard_normal(min(block_size, n - start)) + shift, shift, drift, vol)
+
+            total += y.sum()
+
+            squares += np.sum(y**2)
+
+        price = total / n
+
+        return price, np.sqrt(max(squares / n - price**2, 0.) / (n - 1))
+
+    n_strata = max(n // per_stratum, 1)
+
+    total, variance = 0., 0.
+
+    for start in range(0, n_strata, block_size):
+
+        strata = np.arange(start, min(start + block_size, n_strata))
+
+        u = (strata[:, None] + rng.random((len(strata), per_stratum))) / n_strata
+
+        y = _weighted_payoffs(derivative, norm_ppf(u) + shift, shift, drift, vol)
+
+        total += y.sum()
+
+        variance += np.var(y, axis=1, ddof=1).sum()
+
+    return total / (n_strata * per_stratum), np.sqrt(variance / per_stratum) / n_strata
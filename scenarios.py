@@ -0,0 +1,26 @@
+import numpy as np
+from book import as_book
+
+def scenario_grid(strategies, initial_stock_price, risk_free, sigma, plazo,
+                  spot_shocks=np.linspace(-.3, .3, 21), vol_shocks=np.linspace(-.5, .5, 11), days=0.):
+    """
+    P&L of every strategy under relative spot and volatility shocks.
+
+    The strategies (a list or a Book) are netted into distinct instruments,
+    each instrument is valued once on the grid and the values are shared by
+    all strategies holding it.
+
+    Retorno
+    -------
+    pnl: np.ndarray
+        Array of shape (len(strategies), len(spot_shocks), len(vol_shocks)).
+    """
+
+    book = as_book(strategies, plazo)
+
+    base = book.values([initial_stock_price], [sigma], risk_free)[:, 0, 0]
+
+    shocked = book.values(initial_stock_price * (1. + np.asarray(spot_shocks)),
+                          sigma * (1. + np.asarray(vol_shocks)), risk_free, days)
+
+    return book.to_strategies(shocked - base[:, None, None])
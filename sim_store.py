@@ -0,0 +1,83 @@
+import os
+import numpy as np
+
+class SimulationStore:
+    """
+    Directory of .npy files holding standard normal draws keyed by their
+    generator settings. Files are written once and then opened with np.memmap
+    in read-only mode, so every process on a node maps the same pages instead
+    of regenerating and holding its own copy. The draws are consumed through
+    the draws argument of get_price and Book.get_price.
+    """
+
+    def __init__(self, directory, chunk_size=1_000_000):
+
+        self.directory = directory
+
+        self.chunk_size = chunk_size
+
+        os.makedirs(directory, exist_ok=True)
+
+    def __repr__(self):
+
+        return f'SimulationStore: {self.directory}, {len(self.files())} files'
+
+    def files(self):
+
+        return sorted(name for name in os.listdir(self.directory) if name.endswith('.npy'))
+
+    def _path(self, name):
+
+        return os.path.join(self.directory, name + '.npy')
+
+    def _create(self, path, shape, dtype, fill):
+        """
+        Writes the file chunk by chunk under a temporary name and renames it,
+        so concurrent readers never see a partially written array.
+        """
+
+        if os.path.exists(path):
+
+            return
+
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+
+        array = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=dtype, shape=shape)
+
+        fill(array.reshape(-1, shape[-1]))
+
+        array.flush()
+
+        del array
+
+        os.replace(tmp_path, path)
+
+    def draws(self, n, seed, steps=None, dtype=np.float64):
+        """
+        Read-only memory-mapped standard normals of shape (n,) or (steps, n),
+        generated from np.random.default_rng(seed).
+        """
+
+        dtype = np.dtype(dtype)
+
+        shape = (n,) if steps is None else (steps, n)
+
+        path = self._path(f'normals_n{n}_steps{steps}_seed{seed}_{dtype.name}')
+
+        def fill(array):
+
+            rng = np.random.default_rng(seed)
+
+            for row in array:
+
+                for start in range(0, n, self.chunk_size):
+
+                    row[start:start + self.chunk_size] = rng.standard_normal(min(self.chunk_size, n - start), dtype=dtype)
+
+        self._create(path, shape, dtype, fill)
+
+        return np.load(path, mmap_mode='r')
+
+    def remove(self, name):
+
+        os.remove(os.path.join(self.directory, name))
@@ -9,17 +9,99 @@ class Stock(ABC):
 
         self.type = 'Stock'
 
+    @property
+    def s0(self):
+
+        return self.__s0
+
     @staticmethod
-    def sim_gbm(s0, drift, sigma, plazo, n=None):
+    def sim_gbm(s0, drift, sigma, plazo, n=None, z=None):
+        """
+        Simulates n terminal prices, or one per standard normal draw in z
+        (e.g. read-only draws memory-mapped from a SimulationStore).
+        """
 
         if n is None:
             n = 1
 
+        if z is None:
+            z = np.random.normal(size=n)
+
         st = s0 * np.exp((drift - .5 * sigma**2) * (plazo / 365.) + 
-            sigma * np.sqrt(plazo / 365.) * np.random.normal(size=n))
+            sigma * np.sqrt(plazo / 365.) * z)
         
         return st 
 
+    @staticmethod
+    def sim_gbm_path(s0, drift, sigma, plazos, n=None, z=None):
+        """
+        Simulates one Brownian path per scenario and extends it through the
+        given expiries (in days), so every expiry shares the same path.
+        Precomputed draws z must have shape (len(plazos), n).
+
+        Retorno
+        -------
+        st: np.ndarray
+            Prices of shape (len(plazos), n), rows in the order of plazos.
+        """
+
+        if n is None:
+            n = 1
+
+        plazos = np.asarray(plazos, dtype=float)
+
+        order = np.argsort(plazos)
+
+        steps = np.diff(np.concatenate([[0.], plazos[order]])) / 365.
+
+        if z is None:
+            z = np.random.normal(size=(len(steps), n))
+
+        increments = ((drift - .5 * sigma**2) * steps[:, None] + 
+            sigma * np.sqrt(steps)[:, None] * z)
+
+        st = np.empty_like(increments)
+
+        st[order] = s0 * np.exp(np.cumsum(increments, axis=0))
+
+        return st
+
+    @staticmethod
+    def sim_gbm_steps(s0, drift, sigma, plazo, dw, scheme='exact'):
+        """
+        Builds paths on an even grid of plazo days from Brownian increments dw
+        of shape (n, steps), each with variance plazo / 365 / steps.
+        scheme='exact' samples the GBM exactly at the grid dates and
+        scheme='euler' uses the Euler-Maruyama step.
+
+        Retorno
+        -------
+        paths: np.ndarray
+            Prices of shape (n, steps + 1), starting at s0.
+        """
+
+        dt = plazo / 365. / dw.shape[1]
+
+        if scheme == 'exact':
+
+            steps = np.exp((drift - .5 * sigma**2) * dt + sigma * dw)
+
+        elif scheme == 'euler':
+
+            steps = 1. + drift * dt + sigma * dw
+
+        else:
+
+            raise ValueError(f'Scheme "{scheme}" not recognized.')
+
+        paths = np.empty((dw.shape[0], dw.shape[1] + 1))
+
+        paths[:, 0] = s0
+
+        paths[:, 1:] = s0 * np.cumprod(steps, axis=1)
+
+        return paths
+
     def payoff(self, st):
 
         return st - self.__s0 
@@ -0,0 +1,129 @@
+import numpy as np
+from itertools import islice
+from book import as_book
+
+class StressReport:
+
+    def __init__(self, worst_pnl, worst_scenario, book_pnl, contributions):
+
+        self.worst_pnl = worst_pnl
+
+        self.worst_scenario = worst_scenario
+
+        self.book_pnl = book_pnl
+
+        self.contributions = contributions
+
+    @property
+    def worst_book_scenario(self):
+
+        return int(np.argmin(self.book_pnl))
+
+    @property
+    def worst_book_pnl(self):
+
+        return self.book_pnl[self.worst_book_scenario]
+
+    def top_contributors(self, k=10):
+        """
+        Strategies losing the most in the worst scenario for the book, with
+        their P&L in that scenario.
+        """
+
+        order = np.argsort(self.contributions)[:k]
+
+        return order, self.contributions[order]
+
+    def __repr__(self):
+
+        return (f'Stress: {len(self.book_pnl)} scenarios, worst book P&L {self.worst_book_pnl:.4f} '
+                f'in scenario {self.worst_book_scenario}')
+
+def iter_scenarios(path, chunk_size=10_000, delimiter=',', skiprows=1, usecols=(0, 1)):
+    """
+    Streams (spot return, volatility change) scenario vectors from a text file
+    in chunks of shape (chunk, 2), without loading the whole file.
+    """
+
+    with open(path) as f:
+
+        for _ in range(skiprows):
+
+            next(f, None)
+
+        while True:
+
+            lines = list(islice(f, chunk_size))
+
+            if not lines:
+
+                break
+
+            yield np.loadtxt(lines, delimiter=delimiter, usecols=usecols, ndmin=2)
+
+def stress_test(strategies, scenarios, initial_stock_price, risk_free, sigma, plazo, days=0.):
+    """
+    Replays historical (spot return, volatility change) moves against every
+    strategy. The strategies are netted into a Book and each chunk of
+    scenarios is applied to its distinct instruments in one batched
+    valuation.
+
+    Argumentos
+    ----------
+    scenarios: str or iterable
+        Path of a scenario file (see iter_scenarios) or an iterable of arrays
+        of shape (chunk, 2) with relative spot moves and absolute changes in
+        volatility.
+    """
+
+    book = as_book(strategies, plazo)
+
+    if isinstance(scenarios, str):
+
+        scenarios = iter_scenarios(scenarios)
+
+    base = book.values_along([initial_stock_price], [sigma], risk_free)[:, 0]
+
+    worst_pnl = np.full(len(book), np.inf)
+
+    worst_scenario = np.zeros(len(book), dtype=int)
+
+    book_pnl = []
+
+    contributions = None
+
+    worst_total = np.inf
+
+    seen = 0
+
+    for chunk in scenarios:
+
+        spots = initial_stock_price * (1. + chunk[:, 0])
+
+        sigmas = np.maximum(sigma + chunk[:, 1], 1e-8)
+
+        pnl = book.to_strategies(book.values_along(spots, sigmas, risk_free, days) - base[:, None])
+
+        chunk_worst = np.argmin(pnl, axis=1)
+
+        chunk_worst_pnl = pnl[np.arange(len(book)), chunk_worst]
+
+        improved = chunk_worst_pnl < worst_pnl
+
+        worst_pnl[improved] = chunk_worst_pnl[improved]
+
+        worst_scenario[improved] = seen + chunk_worst[improved]
+
+        total = pnl.sum(axis=0)
+
+        if total.min() < worst_total:
+
+            worst_total = total.min()
+
+            contributions = pnl[:, np.argmin(total)]
+
+        book_pnl.append(total)
+
+        seen += len(chunk)
+
+    return StressReport(worst_pnl, worst_scenario, np.concatenate(book_pnl), contributions)
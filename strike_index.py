@@ -0,0 +1,147 @@
+import numpy as np
+from black_scholes import norm_cdf
+
+class StrikeIndex:
+    """
+    Sorted strikes of one (underlying, expiry, option type) with O(log n)
+    lookups. Every query accepts scalars or arrays and is answered with
+    np.searchsorted, so thousands of legs are resolved in one call.
+    """
+
+    def __init__(self, strikes, option_type, expiry, iv=None, rows=None):
+
+        order = np.argsort(strikes, kind='stable')
+
+        self.strikes = np.asarray(strikes, dtype=float)[order]
+
+        self.option_type = option_type
+
+        self.expiry = expiry
+
+        self.iv = None if iv is None else np.asarray(iv, dtype=float)[order]
+
+        self.rows = None if rows is None else np.asarray(rows)[order]
+
+    def __len__(self):
+
+        return len(self.strikes)
+
+    def __repr__(self):
+
+        return f'StrikeIndex: {self.option_type} {self.expiry}d, {len(self)} strikes'
+
+    def nearest_position(self, targets):
+
+        targets = np.asarray(targets, dtype=float)
+
+        j = np.clip(np.searchsorted(self.strikes, targets), 1, len(self.strikes) - 1)
+
+        below = self.strikes[j - 1]
+
+        return np.where(np.abs(targets - below) <= np.abs(self.strikes[j] - targets), j - 1, j)
+
+    def nearest(self, targets):
+        """
+        Listed strikes closest to the targets.
+        """
+
+        return self.strikes[self.nearest_position(targets)]
+
+    def atm(self, spot):
+
+        return self.nearest(spot)
+
+    def otm(self, spot, n=1):
+        """
+        n-th listed out-of-the-money strike (above the spot for calls, below
+        it for puts). NaN when the chain does not go that far.
+        """
+
+        spot = np.asarray(spot, dtype=float)
+
+        if self.option_type == 'Call':
+
+            j = np.searchsorted(self.strikes, spot, side='right') + n - 1
+
+        else:
+
+            j = np.searchsorted(self.strikes, spot, side='left') - n
+
+        valid = (j >= 0) & (j < len(self.strikes))
+
+        return np.where(valid, self.strikes[np.clip(j, 0, len(self.strikes) - 1)], np.nan)
+
+    def moneyness(self, spot, ratios):
+        """
+        Listed strikes closest to spot * ratio, e.g. ratios=1.1 for 10% above.
+        """
+
+        return self.nearest(np.asarray(spot, dtype=float) * np.asarray(ratios, dtype=float))
+
+    def band(self, spot, low, high):
+        """
+        Listed strikes with low <= strike / spot <= high.
+        """
+
+        return self.strikes[np.searchsorted(self.strikes, low * spot, side='left'):
+                            np.searchsorted(self.strikes, high * spot, side='right')]
+
+    def deltas(self, spot, risk_free, sigma=None):
+        """
+        Black-Scholes deltas of the listed strikes, using the index volatilities
+        unless sigma is given.
+        """
+
+        sigma = self.iv if sigma is None else sigma
+
+        if sigma is None:
+
+            raise ValueError('A volatility is needed to compute deltas.')
+
+        tau = self.expiry / 365.
+
+        vol = np.asarray(sigma, dtype=float) * np.sqrt(tau)
+
+        n_d1 = norm_cdf((np.log(spot / self.strikes) + risk_free * tau) / vol + .5 * vol)
+
+        return n_d1 if self.option_type == 'Call' else n_d1 - 1.
+
+    def delta(self, targets, spot, risk_free, sigma=None):
+        """
+        Listed strikes whose delta is closest to the targets (e.g. 0.25 for a
+        25-delta call, -0.25 for a 25-delta put).
+
+        Deltas fall with the strike for both calls and puts, so the index
+        searches the reversed delta curve.
+        """
+
+        deltas = self.deltas(spot, risk_free, sigma)[::-1]
+
+        targets = np.asarray(targets, dtype=float)
+
+        j = np.clip(np.searchsorted(deltas, targets), 1, len(deltas) - 1)
+
+        j = np.where(np.abs(targets - deltas[j - 1]) <= np.abs(deltas[j] - targets), j - 1, j)
+
+        return self.strikes[len(deltas) - 1 - j]
+
+def build_indexes(chains):
+    """
+    Strike indexes of every (underlying, expiry, option type) in the chains.
+    """
+
+    indexes = {}
+
+    for chain in chains:
+
+        for expiry in chain.expiries:
+
+            for option_type in ('Call', 'Put'):
+
+                rows = chain.block(expiry, option_type)
+
+                if rows.stop > rows.start:
+
+                    indexes[chain.underlying, expiry, option_type] = chain.strike_index(expiry, option_type)
+
+    return indexes
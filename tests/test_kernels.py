@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+numba = pytest.importorskip('numba')
+
+from kernels import fused_price
+from options_base import Call, Put, Strategy
+from stocks_base import Stock
+from black_scholes import analytic_price
+
+@pytest.fixture
+def strategy():
+
+    strategy = Strategy('Test')
+
+    strategy.add_position([(1, Call(95.)), (-2, Call(100.)), (1, Call(105.)), (1, Put(90.)), (1, Stock(100.))])
+
+    strategy.initial_stock_price = 100.
+
+    return strategy
+
+def test_numba_matches_numpy_on_shared_draws(strategy):
+
+    z = np.random.default_rng(0).standard_normal(200_000)
+
+    numpy_price = fused_price(strategy, .05, .2, 90, len(z), draws=z, backend='numpy')
+
+    numba_price = fused_price(strategy, .05, .2, 90, len(z), draws=z, backend='numba')
+
+    assert numba_price == pytest.approx(numpy_price, rel=1e-12)
+
+def test_numba_seeded_price_does_not_depend_on_threads(strategy):
+
+    threads = numba.get_num_threads()
+
+    try:
+
+        numba.set_num_threads(1)
+
+        single = fused_price(strategy, .05, .2, 90, 500_000, seed=7, backend='numba')
+
+        numba.set_num_threads(numba.config.NUMBA_NUM_THREADS)
+
+        multi = fused_price(strategy, .05, .2, 90, 500_000, seed=7, backend='numba')
+
+    finally:
+
+        numba.set_num_threads(threads)
+
+    assert single == multi
+
+def test_numba_seeded_price_matches_analytic(strategy):
+
+    price = fused_price(strategy, .05, .2, 90, 1_000_000, seed=2**32 - 1, backend='numba')
+
+    assert price == pytest.approx(analytic_price(strategy, .05, .2, 90), abs=.05)
+
+def test_auto_backend_falls_back_for_float32(strategy):
+
+    z = np.random.default_rng(1).standard_normal(100_000)
+
+    price = fused_price(strategy, .05, .2, 90, len(z), draws=z, dtype=np.float32)
+
+    assert price == pytest.approx(fused_price(strategy, .05, .2, 90, len(z), draws=z, backend='numpy',
+                                              dtype=np.float32))